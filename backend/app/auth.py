@@ -5,32 +5,44 @@ from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, inspect
+from sqlalchemy.orm import make_transient_to_detached
+from functools import lru_cache
+from urllib.parse import parse_qsl
 import hashlib
 import hmac
+import json
+import time
 
 from app.config import settings
 from app.database import get_db
 from app.models import Player
+from app.presence import presence_tracker
+from app.cache import player_cache, token_cache, init_data_cache
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
 
-def verify_telegram_auth(auth_data: dict, bot_token: str) -> bool:
-    """Проверка подписи данных от Telegram"""
-    check_hash = auth_data.pop('hash', None)
-    if not check_hash:
-        return False
-    
+@lru_cache()
+def _login_widget_secret_key(bot_token: str) -> bytes:
+    """Секретный ключ для Login Widget: sha256(bot_token)"""
+    return hashlib.sha256(bot_token.encode()).digest()
+
+
+@lru_cache()
+def _webapp_secret_key(bot_token: str) -> bytes:
+    """Секретный ключ для WebApp: HMAC_SHA256("WebAppData", bot_token)"""
+    return hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+
+
+def _check_signature(fields: dict, check_hash: str, secret_key: bytes) -> bool:
+    """Сверить hash с подписью data-check-string"""
     # Сортируем и формируем строку для проверки
     data_check_string = '\n'.join(
-        f'{k}={v}' for k, v in sorted(auth_data.items()) if v is not None
+        f'{k}={v}' for k, v in sorted(fields.items()) if v is not None
     )
     
-    # Создаём секретный ключ
-    secret_key = hashlib.sha256(bot_token.encode()).digest()
-    
     # Вычисляем hash
     calculated_hash = hmac.new(
         secret_key,
@@ -41,6 +53,60 @@ def verify_telegram_auth(auth_data: dict, bot_token: str) -> bool:
     return hmac.compare_digest(calculated_hash, check_hash)
 
 
+def _is_fresh(auth_date) -> bool:
+    """auth_date не старше telegram_auth_max_age"""
+    try:
+        age = time.time() - int(auth_date)
+    except (TypeError, ValueError):
+        return False
+    return age <= settings.telegram_auth_max_age
+
+
+def verify_telegram_auth(auth_data: dict, bot_token: str) -> bool:
+    """Проверка подписи данных от Telegram Login Widget"""
+    fields = dict(auth_data)
+    check_hash = fields.pop('hash', None)
+    if not check_hash:
+        return False
+    
+    if not _check_signature(fields, check_hash, _login_widget_secret_key(bot_token)):
+        return False
+    
+    return _is_fresh(fields.get('auth_date'))
+
+
+def verify_webapp_init_data(init_data: str, bot_token: str) -> Optional[dict]:
+    """
+    Проверка строки initData из Telegram WebApp.
+    
+    Возвращает поля initData (user уже распарсен из JSON)
+    или None, если подпись неверна или данные устарели.
+    """
+    fields = dict(parse_qsl(init_data, keep_blank_values=True))
+    check_hash = fields.pop('hash', None)
+    if not check_hash:
+        return None
+    
+    if not _check_signature(fields, check_hash, _webapp_secret_key(bot_token)):
+        return None
+    
+    if not _is_fresh(fields.get('auth_date')):
+        return None
+    
+    if 'user' in fields:
+        try:
+            fields['user'] = json.loads(fields['user'])
+        except ValueError:
+            return None
+    return fields
+
+
+def init_data_cache_ttl(auth_date) -> float:
+    """Сколько ещё можно доверять проверенной initData"""
+    remaining = int(auth_date) + settings.telegram_auth_max_age - time.time()
+    return min(init_data_cache.ttl, remaining)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Создание JWT токена"""
     to_encode = data.copy()
@@ -65,6 +131,38 @@ def decode_access_token(token: str) -> Optional[dict]:
         return None
 
 
+def decode_access_token_cached(token: str) -> Optional[dict]:
+    """Декодирование JWT с запоминанием проверенных токенов до их истечения"""
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    now = time.time()
+    if payload is not None:
+        if payload.get("exp", 0) > now:
+            return payload
+        token_cache.invalidate(key)
+    
+    payload = decode_access_token(token)
+    if payload is not None:
+        ttl = min(token_cache.ttl, payload.get("exp", now) - now)
+        if ttl > 0:
+            token_cache.set(key, payload, ttl=ttl)
+    return payload
+
+
+def _player_snapshot(player: Player) -> dict:
+    """Снимок колонок игрока для кэша"""
+    return {attr.key: getattr(player, attr.key) for attr in inspect(Player).column_attrs}
+
+
+async def _player_from_snapshot(db: AsyncSession, snapshot: dict) -> Player:
+    """Прикрепить игрока из кэша к сессии без запроса в БД"""
+    values = dict(snapshot)
+    values["personal_banwords"] = list(values.get("personal_banwords") or [])
+    player = Player(**values)
+    make_transient_to_detached(player)
+    return await db.merge(player, load=False)
+
+
 async def get_current_player(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db)
@@ -77,7 +175,7 @@ async def get_current_player(
     )
     
     token = credentials.credentials
-    payload = decode_access_token(token)
+    payload = decode_access_token_cached(token)
     
     if payload is None:
         raise credentials_exception
@@ -86,6 +184,12 @@ async def get_current_player(
     if telegram_id is None:
         raise credentials_exception
     
+    presence_tracker.touch(telegram_id)
+    
+    snapshot = player_cache.get(telegram_id)
+    if snapshot is not None:
+        return await _player_from_snapshot(db, snapshot)
+    
     result = await db.execute(
         select(Player).where(Player.telegram_id == telegram_id)
     )
@@ -94,6 +198,7 @@ async def get_current_player(
     if player is None:
         raise credentials_exception
     
+    player_cache.set(telegram_id, _player_snapshot(player))
     return player
 
 
@@ -0,0 +1,98 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from app.config import settings
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Кэш в памяти процесса с временем жизни записей.
+
+    get_or_compute объединяет конкурентные промахи по одному ключу:
+    значение считает первый запрос, остальные ждут его результат.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: dict[Hashable, tuple[float, Any]] = {}
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Получить значение, если оно ещё не устарело"""
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            return default
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Положить значение в кэш"""
+        if len(self._data) >= self.maxsize and key not in self._data:
+            self._evict()
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+
+    def invalidate(self, key: Hashable):
+        """Удалить значение из кэша"""
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def _evict(self):
+        # Сначала выкидываем устаревшие записи, потом самую старую
+        now = time.monotonic()
+        for key in [k for k, (expires_at, _) in self._data.items() if expires_at <= now]:
+            del self._data[key]
+        if len(self._data) >= self.maxsize:
+            self._data.pop(next(iter(self._data)))
+
+    async def get_or_compute(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Получить значение или посчитать его один раз для всех ожидающих
+
+        factory выполняется в отдельной задаче, и все ждут её через shield:
+        отмена одного запроса (клиент отключился) не отменяет расчёт
+        и не роняет остальных.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._compute(key, factory))
+            task.add_done_callback(_retrieve_exception)
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _compute(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await factory()
+            self.set(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+
+def _retrieve_exception(task: asyncio.Task):
+    # Если все ожидающие отменены, исключение расчёта некому получить
+    if not task.cancelled():
+        task.exception()
+
+
+# Игроки по telegram_id (снимки колонок) — для get_current_player
+player_cache = TTLCache(ttl=settings.player_cache_seconds)
+
+# Проверенные JWT по хэшу токена
+token_cache = TTLCache(ttl=settings.token_cache_seconds)
+
+# Уже проверенные initData WebApp (sha256 строки -> telegram_id и токен)
+init_data_cache = TTLCache(ttl=settings.init_data_cache_seconds)
@@ -6,9 +6,18 @@ from functools import lru_cache
 class Settings(BaseSettings):
     # Database
     database_url: str = "postgresql+asyncpg://localhost:5432/sqwoz_games"
+    database_read_url: str = ""  # Реплика для read-only эндпоинтов (необязательно)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 60 * 30  # Пересоздавать соединения старше N секунд
+    db_pool_pre_ping: bool = False  # SELECT 1 при каждой выдаче соединения; обычно хватает pool_recycle
+    db_pool_warmup: bool = True  # Открыть db_pool_size соединений при старте
+    db_statement_cache_size: int = 100  # 0 — за pgbouncer / пулером Neon
     
     # Telegram
     telegram_bot_token: str = ""
+    telegram_auth_max_age: int = 60 * 60 * 24  # Сколько действительна подпись initData
     
     # JWT
     jwt_secret: str = "change-this-secret"
@@ -17,6 +26,7 @@ class Settings(BaseSettings):
     
     # Admin
     admin_password: str = "sqwoz2024"
+    metrics_token: str = ""  # Токен Prometheus для /metrics (Authorization: Bearer); пусто — только админский пароль
     
     # Ban multipliers
     ban_lottery_multiplier: int = 2
@@ -27,6 +37,29 @@ class Settings(BaseSettings):
     starting_balance: int = 1000
     base_buyout_price: int = 100
     
+    # Кэширование
+    admin_stats_cache_seconds: float = 5
+    player_cache_seconds: float = 10
+    token_cache_seconds: float = 300
+    init_data_cache_seconds: float = 60 * 60
+    
+    # Ответы меньше этого размера не сжимаются
+    gzip_minimum_size: int = 1000
+    
+    # Онлайн: как часто писать last_active_at в БД
+    presence_flush_seconds: float = 60
+    
+    # Диагностика SQL (для разработки и тестов)
+    slow_query_ms: float = 0  # Логировать запросы дольше N мс с параметрами и местом вызова; 0 — выключено
+    query_budget_enforce: bool = False  # Превышение бюджета запросов эндпоинта — ошибка, а не предупреждение
+    
+    # Сырые game_sessions старше N дней удаляются (итоги остаются в game_session_daily)
+    game_sessions_retention_days: int = 90
+    game_sessions_archive_batch: int = 5000
+    
+    # Загрузка списков слов: строк на одну пачку (INSERT + commit)
+    wordlist_import_chunk: int = 5000
+    
     class Config:
         env_file = ".env"
         extra = "ignore"
@@ -1,15 +1,62 @@
-from typing import List, Optional
+import random
+from typing import AsyncIterator, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, update
+from sqlalchemy import select, func, update, delete, case, or_, tuple_, text
 from sqlalchemy.orm import selectinload
+from sqlalchemy.dialects import postgresql, sqlite
 from datetime import datetime, timedelta
 
 from app.models import (
-    Player, BanHistory, GameSession, WeeklyBanword, 
-    GlobalSettings, GlobalBanword, ChatSettings, LotteryWordPool, BAN_DURATION_HOURS
+    Player, BanHistory, GameSession, GameSessionDaily, PlayerGameStats, WeeklyBanword, 
+    GlobalSettings, GlobalBanword, ChatSettings, LotteryWordPool, PlatformCounter,
+    CounterKey, BAN_DURATION_HOURS
 )
 from app.schemas import PlayerCreate, GameSessionCreate, BanReason
 from app.config import settings
+from app.ranking import balance_ranking
+from app.cache import TTLCache, player_cache
+from app.database import async_session_maker
+from app.presence import presence_tracker
+from app.etag import resource_versions, Resource
+from app.wordlists import WordSet
+
+
+# Самый длинный лидерборд, который отдаёт API
+LEADERBOARD_MAX_LIMIT = 100
+
+
+def _player_changed(player: Player):
+    """Синхронизировать производные структуры после коммита изменений игрока"""
+    player_cache.invalidate(player.telegram_id)
+    # Версию лидерборда меняем, только если игрок был или стал в топе
+    if balance_ranking.sync(player, top=LEADERBOARD_MAX_LIMIT):
+        resource_versions.bump(Resource.LEADERBOARD)
+
+
+def _insert(db: AsyncSession, model):
+    """INSERT с поддержкой ON CONFLICT для диалекта текущей БД"""
+    if db.bind.dialect.name == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)
+
+
+def _greatest(db: AsyncSession, *args):
+    """GREATEST(...) для диалекта текущей БД (в SQLite это max с несколькими аргументами)"""
+    if db.bind.dialect.name == "sqlite":
+        return func.max(*args)
+    return func.greatest(*args)
+
+
+async def _bump_counters(db: AsyncSession, **deltas: int):
+    """Изменить счётчики платформы в текущей транзакции (одним UPDATE)"""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    await db.execute(
+        update(PlatformCounter)
+        .where(PlatformCounter.key.in_(list(deltas)))
+        .values(value=PlatformCounter.value + case(deltas, value=PlatformCounter.key, else_=0))
+    )
 
 
 # === Player CRUD ===
@@ -23,9 +70,16 @@ async def get_player_by_telegram_id(db: AsyncSession, telegram_id: int) -> Optio
 
 
 async def get_player_by_id(db: AsyncSession, player_id: int) -> Optional[Player]:
-    """Получить игрока по ID"""
+    """
+    Получить игрока по ID.
+    
+    Всегда перечитывает строку, даже если игрок уже в сессии (например,
+    пришёл из кэша get_current_player) — изменения считаются от актуальных данных.
+    """
     result = await db.execute(
-        select(Player).where(Player.id == player_id)
+        select(Player)
+        .where(Player.id == player_id)
+        .execution_options(populate_existing=True)
     )
     return result.scalar_one_or_none()
 
@@ -41,63 +95,166 @@ async def create_player(db: AsyncSession, player_data: PlayerCreate) -> Player:
         current_buyout_price=settings.base_buyout_price,
     )
     db.add(player)
+    await _bump_counters(db, total_players=1, total_balance=settings.starting_balance)
     await db.commit()
     await db.refresh(player)
+    _player_changed(player)
     return player
 
 
 async def get_or_create_player(db: AsyncSession, player_data: PlayerCreate) -> tuple[Player, bool]:
-    """Получить или создать игрока"""
+    """
+    Получить или создать игрока.
+    
+    Вернувшийся игрок с тем же профилем — один SELECT по индексу telegram_id,
+    без записи. Профиль обновляется, только если username/first_name/last_name
+    изменились. Новый игрок вставляется INSERT ... ON CONFLICT DO NOTHING:
+    строка в RETURNING — признак того, что вставили именно мы.
+    """
+    presence_tracker.touch(player_data.telegram_id)
+    
     player = await get_player_by_telegram_id(db, player_data.telegram_id)
-    if player:
-        # Обновляем данные профиля
-        player.username = player_data.username
-        player.first_name = player_data.first_name
-        player.last_name = player_data.last_name
-        player.last_active_at = datetime.utcnow()
-        await db.commit()
-        return player, False
+    if player is None:
+        result = await db.execute(
+            _insert(db, Player)
+            .values(
+                telegram_id=player_data.telegram_id,
+                username=player_data.username,
+                first_name=player_data.first_name,
+                last_name=player_data.last_name,
+                balance=settings.starting_balance,
+                current_buyout_price=settings.base_buyout_price,
+            )
+            .on_conflict_do_nothing(index_elements=[Player.telegram_id])
+            .returning(Player)
+        )
+        player = result.scalar_one_or_none()
+        if player is not None:
+            await _bump_counters(db, total_players=1, total_balance=player.balance)
+            await db.commit()
+            _player_changed(player)
+            return player, True
+        # Параллельный запрос успел создать игрока
+        player = await get_player_by_telegram_id(db, player_data.telegram_id)
     
-    player = await create_player(db, player_data)
-    return player, True
+    profile = {
+        "username": player_data.username,
+        "first_name": player_data.first_name,
+        "last_name": player_data.last_name,
+    }
+    if any(getattr(player, field) != value for field, value in profile.items()):
+        for field, value in profile.items():
+            setattr(player, field, value)
+        await db.commit()
+        _player_changed(player)
+    return player, False
 
 
 async def update_player_balance(db: AsyncSession, player_id: int, amount: int) -> Player:
     """Обновить баланс игрока"""
-    result = await db.execute(
-        select(Player).where(Player.id == player_id)
-    )
-    player = result.scalar_one_or_none()
+    player = await get_player_by_id(db, player_id)
     if player:
         player.balance += amount
         if amount > 0:
             player.total_earned += amount
         else:
             player.total_spent += abs(amount)
+        await _bump_counters(db, total_balance=amount)
         await db.commit()
         await db.refresh(player)
+        _player_changed(player)
     return player
 
 
 async def set_player_balance(db: AsyncSession, player_id: int, balance: int) -> Player:
     """Установить баланс игрока"""
-    result = await db.execute(
-        select(Player).where(Player.id == player_id)
-    )
-    player = result.scalar_one_or_none()
+    player = await get_player_by_id(db, player_id)
     if player:
+        await _bump_counters(db, total_balance=balance - player.balance)
         player.balance = balance
         await db.commit()
         await db.refresh(player)
+        _player_changed(player)
     return player
 
 
-async def get_all_players(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Player]:
-    """Получить всех игроков"""
+# Колонки для списка игроков в админке (без personal_banwords)
+PLAYER_LIST_COLUMNS = (
+    Player.id, Player.telegram_id, Player.username, Player.first_name, Player.last_name,
+    Player.balance, Player.ban_count, Player.current_buyout_price, Player.is_banned,
+    Player.ban_expires_at, Player.last_ban_reason, Player.last_ban_word,
+    Player.games_played, Player.games_won, Player.created_at, Player.last_active_at,
+)
+
+
+def encode_player_cursor(balance: int, player_id: int) -> str:
+    """Курсор страницы игроков: последняя пара (balance, id)"""
+    return f"{balance}_{player_id}"
+
+
+def decode_player_cursor(cursor: str) -> Optional[tuple[int, int]]:
+    """Разобрать курсор страницы игроков"""
+    try:
+        balance, player_id = cursor.split("_")
+        return int(balance), int(player_id)
+    except ValueError:
+        return None
+
+
+async def get_all_players(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[tuple[int, int]] = None,
+    search: Optional[str] = None,
+    compact: bool = False,
+) -> list:
+    """
+    Получить игроков, отсортированных по балансу.
+    
+    cursor — пара (balance, id) последнего игрока предыдущей страницы,
+    с ним страница читается по индексу без OFFSET. Возвращает строки
+    с колонками PLAYER_LIST_COLUMNS (без compact — ещё и personal_banwords),
+    ORM-объекты не создаются.
+    """
+    columns = PLAYER_LIST_COLUMNS if compact else PLAYER_LIST_COLUMNS + (Player.personal_banwords,)
+    query = (
+        select(*columns)
+        .order_by(Player.balance.desc(), Player.id.desc())
+        .limit(limit)
+    )
+    
+    if cursor is not None:
+        query = query.where(tuple_(Player.balance, Player.id) < tuple_(*cursor))
+    elif skip:
+        query = query.offset(skip)
+    
+    if search:
+        search = search.strip()
+        conditions = [func.lower(Player.username).startswith(search.lower().lstrip("@"), autoescape=True)]
+        if search.isdigit():
+            conditions.append(Player.telegram_id == int(search))
+        query = query.where(or_(*conditions))
+    
+    result = await db.execute(query)
+    return result.all()
+
+
+async def get_top_players(db: AsyncSession, limit: int = 20) -> list:
+    """Топ незабаненных игроков по балансу (строки, в порядке рейтинга)"""
     result = await db.execute(
-        select(Player).offset(skip).limit(limit).order_by(Player.balance.desc())
+        select(
+            Player.telegram_id,
+            Player.username,
+            Player.first_name,
+            Player.balance,
+            Player.games_won.label("total_wins"),
+        )
+        .where(Player.is_banned == False)
+        .order_by(Player.balance.desc(), Player.id)
+        .limit(limit)
     )
-    return result.scalars().all()
+    return result.all()
 
 
 async def get_players_count(db: AsyncSession) -> int:
@@ -108,6 +265,11 @@ async def get_players_count(db: AsyncSession) -> int:
 
 async def get_online_players_count(db: AsyncSession, minutes: int = 15) -> int:
     """Количество онлайн игроков (активных за последние N минут)"""
+    count = presence_tracker.online_count(minutes)
+    if count is not None:
+        return count
+    
+    # Трекер ещё не набрал окно — считаем по индексу last_active_at
     threshold = datetime.utcnow() - timedelta(minutes=minutes)
     result = await db.execute(
         select(func.count(Player.id)).where(Player.last_active_at >= threshold)
@@ -115,16 +277,36 @@ async def get_online_players_count(db: AsyncSession, minutes: int = 15) -> int:
     return result.scalar()
 
 
+async def get_player_rank(db: AsyncSession, player: Player, neighbours: int = 2) -> dict:
+    """Место игрока в рейтинге по балансу и его соседи"""
+    await balance_ranking.ensure_loaded(db)
+    rank = balance_ranking.rank_of(player.id, player.balance)
+    above, below = balance_ranking.neighbours(player.id, player.balance, neighbours)
+    
+    # Подтягиваем соседей одним запросом
+    ids = [player_id for _, player_id in above + below]
+    players = {}
+    if ids:
+        result = await db.execute(select(Player).where(Player.id.in_(ids)))
+        players = {p.id: p for p in result.scalars().all()}
+    
+    return {
+        "rank": rank,
+        "total_players": balance_ranking.total,
+        "balance": player.balance,
+        "above": [(r, players[pid]) for r, pid in above if pid in players],
+        "below": [(r, players[pid]) for r, pid in below if pid in players],
+    }
+
+
 async def update_player_personal_banwords(db: AsyncSession, player_id: int, banwords: List[str]) -> Player:
     """Обновить личные банворды игрока"""
-    result = await db.execute(
-        select(Player).where(Player.id == player_id)
-    )
-    player = result.scalar_one_or_none()
+    player = await get_player_by_id(db, player_id)
     if player:
         player.personal_banwords = banwords
         await db.commit()
         await db.refresh(player)
+        _player_changed(player)
     return player
 
 
@@ -167,9 +349,16 @@ async def ban_player(
         buyout_price=buyout_price,
         duration_hours=duration_hours,
         expires_at=expires_at,
+        created_at=datetime.utcnow(),
     )
     db.add(ban)
     
+    await _bump_counters(
+        db,
+        total_bans=1,
+        active_bans=0 if player.is_banned else 1,
+    )
+    
     # Обновляем игрока
     player.is_banned = True
     player.ban_expires_at = expires_at
@@ -179,7 +368,7 @@ async def ban_player(
     player.current_buyout_price = buyout_price  # Цена растёт
     
     await db.commit()
-    await db.refresh(ban)
+    _player_changed(player)
     return ban
 
 
@@ -193,7 +382,9 @@ async def check_ban_expired(db: AsyncSession, player_id: int) -> bool:
     if player.ban_expires_at and player.ban_expires_at <= datetime.utcnow():
         player.is_banned = False
         player.ban_expires_at = None
+        await _bump_counters(db, active_bans=-1)
         await db.commit()
+        _player_changed(player)
         return True  # Бан истёк и снят
     
     return False  # Бан ещё активен
@@ -231,7 +422,9 @@ async def buyout_ban(db: AsyncSession, player_id: int) -> tuple[bool, str, int]:
     if not ban:
         # Странная ситуация — забанен, но нет записи
         player.is_banned = False
+        await _bump_counters(db, active_bans=-1)
         await db.commit()
+        _player_changed(player)
         return True, "Бан снят", 0
     
     if player.balance < ban.buyout_price:
@@ -246,10 +439,57 @@ async def buyout_ban(db: AsyncSession, player_id: int) -> tuple[bool, str, int]:
     ban.was_paid = True
     ban.paid_at = datetime.utcnow()
     
+    await _bump_counters(db, total_balance=-ban.buyout_price, active_bans=-1)
     await db.commit()
+    _player_changed(player)
     return True, "Бан успешно выкуплен!", ban.buyout_price
 
 
+async def unban_player(db: AsyncSession, player: Player) -> Player:
+    """Снять бан с игрока"""
+    if player.is_banned:
+        await _bump_counters(db, active_bans=-1)
+    player.is_banned = False
+    player.ban_expires_at = None
+    await db.commit()
+    _player_changed(player)
+    return player
+
+
+async def reset_player_to_starting_balance(db: AsyncSession, player: Player) -> Player:
+    """Сбросить баланс и цену выкупа до начальных"""
+    await _bump_counters(db, total_balance=settings.starting_balance - player.balance)
+    player.balance = settings.starting_balance
+    player.current_buyout_price = settings.base_buyout_price
+    await db.commit()
+    _player_changed(player)
+    return player
+
+
+async def unban_expired_players(db: AsyncSession) -> int:
+    """Снять все истёкшие баны. Возвращает количество разбаненных"""
+    now = datetime.utcnow()
+    
+    # Находим всех забаненных с истёкшим сроком
+    result = await db.execute(
+        select(Player).where(
+            Player.is_banned == True,
+            Player.ban_expires_at <= now
+        )
+    )
+    expired_players = result.scalars().all()
+    
+    for player in expired_players:
+        player.is_banned = False
+        player.ban_expires_at = None
+    
+    await _bump_counters(db, active_bans=-len(expired_players))
+    await db.commit()
+    for player in expired_players:
+        _player_changed(player)
+    return len(expired_players)
+
+
 async def get_player_ban_history(db: AsyncSession, player_id: int) -> List[BanHistory]:
     """История банов игрока"""
     result = await db.execute(
@@ -267,7 +507,30 @@ async def create_game_session(
     player_id: int, 
     session_data: GameSessionCreate
 ) -> GameSession:
-    """Создать сессию игры"""
+    """
+    Сохранить игру: сессия, баланс и статистика игрока в одной транзакции.
+    
+    Игрок обновляется одним UPDATE ... RETURNING, без предварительного SELECT.
+    """
+    now = datetime.utcnow()
+    balance_change = session_data.win_amount - session_data.bet_amount
+    
+    result = await db.execute(
+        update(Player)
+        .where(Player.id == player_id)
+        .values(
+            balance=Player.balance + balance_change,
+            total_earned=Player.total_earned + max(balance_change, 0),
+            total_spent=Player.total_spent + max(-balance_change, 0),
+            games_played=Player.games_played + 1,
+            games_won=Player.games_won + (1 if session_data.is_win else 0),
+            last_active_at=now,
+        )
+        .returning(Player)
+        .execution_options(populate_existing=True)
+    )
+    player = result.scalar_one_or_none()
+    
     session = GameSession(
         player_id=player_id,
         game_type=session_data.game_type,
@@ -275,22 +538,149 @@ async def create_game_session(
         bet_amount=session_data.bet_amount,
         win_amount=session_data.win_amount,
         is_win=session_data.is_win,
+        created_at=now,
     )
     db.add(session)
+    await db.flush()
     
-    # Обновляем статистику игрока
-    player = await get_player_by_id(db, player_id)
-    if player:
-        player.games_played += 1
-        if session_data.is_win:
-            player.games_won += 1
-        player.last_active_at = datetime.utcnow()
-    
+    await _add_to_daily_rollup(db, player_id, session_data, now)
+    await _add_to_player_stats(db, player_id, session_data)
+    await _bump_counters(db, total_games=1, total_balance=balance_change)
     await db.commit()
-    await db.refresh(session)
+    if player:
+        _player_changed(player)
     return session
 
 
+async def _add_to_daily_rollup(
+    db: AsyncSession,
+    player_id: int,
+    session_data: GameSessionCreate,
+    played_at: datetime
+):
+    """Добавить игру в дневные итоги игрока (upsert в текущей транзакции)"""
+    stmt = _insert(db, GameSessionDaily).values(
+        player_id=player_id,
+        game_type=session_data.game_type,
+        day=played_at.date(),
+        plays=1,
+        wins=1 if session_data.is_win else 0,
+        total_bet=session_data.bet_amount,
+        total_win=session_data.win_amount,
+        best_score=session_data.score,
+    )
+    excluded = stmt.excluded
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[GameSessionDaily.player_id, GameSessionDaily.game_type, GameSessionDaily.day],
+            set_={
+                "plays": GameSessionDaily.plays + excluded.plays,
+                "wins": GameSessionDaily.wins + excluded.wins,
+                "total_bet": GameSessionDaily.total_bet + excluded.total_bet,
+                "total_win": GameSessionDaily.total_win + excluded.total_win,
+                "best_score": _greatest(db, GameSessionDaily.best_score, excluded.best_score),
+            }
+        )
+    )
+
+
+async def _add_to_player_stats(db: AsyncSession, player_id: int, session_data: GameSessionCreate):
+    """Обновить статистику игрока по типу игры (upsert в текущей транзакции)"""
+    stmt = _insert(db, PlayerGameStats).values(
+        player_id=player_id,
+        game_type=session_data.game_type,
+        plays=1,
+        wins=1 if session_data.is_win else 0,
+        net_profit=session_data.win_amount - session_data.bet_amount,
+        best_score=session_data.score,
+        current_streak=1 if session_data.is_win else 0,
+        best_streak=1 if session_data.is_win else 0,
+    )
+    excluded = stmt.excluded
+    # В SET справа старые значения строки, поэтому серия считается от них
+    streak = (PlayerGameStats.current_streak + 1) if session_data.is_win else 0
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[PlayerGameStats.player_id, PlayerGameStats.game_type],
+            set_={
+                "plays": PlayerGameStats.plays + excluded.plays,
+                "wins": PlayerGameStats.wins + excluded.wins,
+                "net_profit": PlayerGameStats.net_profit + excluded.net_profit,
+                "best_score": _greatest(db, PlayerGameStats.best_score, excluded.best_score),
+                "current_streak": streak,
+                "best_streak": _greatest(db, PlayerGameStats.best_streak, streak),
+                "updated_at": func.now(),
+            }
+        )
+    )
+
+
+async def get_player_game_stats(db: AsyncSession, player_id: int, days: Optional[int] = None) -> List[dict]:
+    """
+    Статистика игрока по типам игр.
+    
+    Без days — из player_game_stats за всё время, с days — сумма дневных
+    итогов за последние N дней (серии в этом режиме не считаются).
+    """
+    if days is None:
+        result = await db.execute(
+            select(
+                PlayerGameStats.game_type,
+                PlayerGameStats.plays,
+                PlayerGameStats.wins,
+                PlayerGameStats.net_profit,
+                PlayerGameStats.best_score,
+                PlayerGameStats.current_streak,
+                PlayerGameStats.best_streak,
+            )
+            .where(PlayerGameStats.player_id == player_id)
+            .order_by(PlayerGameStats.game_type)
+        )
+        return [row._asdict() for row in result.all()]
+    
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    result = await db.execute(
+        select(
+            GameSessionDaily.game_type,
+            func.sum(GameSessionDaily.plays).label("plays"),
+            func.sum(GameSessionDaily.wins).label("wins"),
+            (func.sum(GameSessionDaily.total_win) - func.sum(GameSessionDaily.total_bet)).label("net_profit"),
+            func.max(GameSessionDaily.best_score).label("best_score"),
+        )
+        .where(GameSessionDaily.player_id == player_id, GameSessionDaily.day >= since)
+        .group_by(GameSessionDaily.game_type)
+        .order_by(GameSessionDaily.game_type)
+    )
+    return [row._asdict() for row in result.all()]
+
+
+async def archive_game_sessions(db: AsyncSession, retention_days: Optional[int] = None) -> int:
+    """
+    Удалить сырые сессии старше срока хранения.
+    
+    Итоги по ним уже лежат в game_session_daily. Удаляем пачками по
+    game_sessions_archive_batch строк с коммитом после каждой, чтобы
+    не держать длинную транзакцию и блокировки на горячей таблице.
+    """
+    if retention_days is None:
+        retention_days = settings.game_sessions_retention_days
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    
+    deleted = 0
+    while True:
+        batch = (
+            select(GameSession.id)
+            .where(GameSession.created_at < cutoff)
+            .limit(settings.game_sessions_archive_batch)
+            .scalar_subquery()
+        )
+        result = await db.execute(delete(GameSession).where(GameSession.id.in_(batch)))
+        await db.commit()
+        deleted += result.rowcount
+        if result.rowcount < settings.game_sessions_archive_batch:
+            return deleted
+
+
 async def get_total_games_played(db: AsyncSession) -> int:
     """Общее количество сыгранных игр"""
     result = await db.execute(select(func.sum(Player.games_played)))
@@ -320,7 +710,9 @@ async def create_weekly_banword(db: AsyncSession, word: str) -> WeeklyBanword:
         expires_at=datetime.utcnow() + timedelta(days=7)
     )
     db.add(banword)
+    await _bump_counters(db, weekly_banwords=1)
     await db.commit()
+    resource_versions.bump(Resource.WEEKLY_BANWORDS)
     await db.refresh(banword)
     return banword
 
@@ -332,8 +724,11 @@ async def deactivate_weekly_banword(db: AsyncSession, banword_id: int) -> bool:
     )
     banword = result.scalar_one_or_none()
     if banword:
+        if banword.is_active:
+            await _bump_counters(db, weekly_banwords=-1)
         banword.is_active = False
         await db.commit()
+        resource_versions.bump(Resource.WEEKLY_BANWORDS)
         return True
     return False
 
@@ -353,6 +748,7 @@ async def add_lottery_word(db: AsyncSession, word: str) -> LotteryWordPool:
     word_obj = LotteryWordPool(word=word.lower().strip())
     db.add(word_obj)
     await db.commit()
+    resource_versions.bump(Resource.LOTTERY_WORDS)
     await db.refresh(word_obj)
     return word_obj
 
@@ -366,94 +762,226 @@ async def remove_lottery_word(db: AsyncSession, word_id: int) -> bool:
     if word_obj:
         word_obj.is_active = False
         await db.commit()
+        resource_versions.bump(Resource.LOTTERY_WORDS)
         return True
     return False
 
 
-async def get_random_lottery_word(db: AsyncSession) -> Optional[str]:
-    """Получить случайное слово из пула лотереи"""
+async def _pick_lottery_word(db: AsyncSession) -> Optional[str]:
+    """
+    Выбрать слово лотереи и увеличить его times_used (без коммита).
+    
+    Берётся случайное из наименее использованных активных слов. Пул в память не
+    грузится и не сортируется: минимум times_used и границы id среди таких слов —
+    крайние записи частичного индекса (times_used, id) WHERE is_active, дальше
+    по тому же индексу берётся первое слово с id не меньше случайного.
+    SKIP LOCKED не даёт двум параллельным розыгрышам взять одно слово.
+    """
+    active = LotteryWordPool.is_active == True
+    least_used = select(func.min(LotteryWordPool.times_used)).where(active).scalar_subquery()
+    tied = (active, LotteryWordPool.times_used == least_used)
     result = await db.execute(
-        select(LotteryWordPool).where(LotteryWordPool.is_active == True)
+        select(
+            least_used,
+            select(func.min(LotteryWordPool.id)).where(*tied).scalar_subquery(),
+            select(func.max(LotteryWordPool.id)).where(*tied).scalar_subquery(),
+        )
     )
-    words = result.scalars().all()
-    
-    if not words:
+    times_used, min_id, max_id = result.one()
+    if times_used is None:
         return None
     
-    # Выбираем случайное слово
-    import random
-    selected_word = random.choice(words)
+    probe = (
+        select(LotteryWordPool.id)
+        .where(active, LotteryWordPool.times_used == times_used,
+               LotteryWordPool.id >= random.randint(min_id, max_id))
+        .order_by(LotteryWordPool.id)
+    )
+    # Слова после probe заняты параллельным розыгрышем — берём любое наименее использованное
+    fallback = select(LotteryWordPool.id).where(active).order_by(
+        LotteryWordPool.times_used, LotteryWordPool.id
+    )
+    for candidate in (probe, fallback):
+        result = await db.execute(
+            update(LotteryWordPool)
+            .where(LotteryWordPool.id == (
+                candidate.limit(1).with_for_update(skip_locked=True).scalar_subquery()
+            ))
+            .values(times_used=LotteryWordPool.times_used + 1)
+            .returning(LotteryWordPool.word)
+        )
+        word = result.scalar_one_or_none()
+        if word is not None:
+            return word
+    return None
+
+
+async def get_random_lottery_word(db: AsyncSession) -> Optional[str]:
+    """Получить случайное слово из пула лотереи (реже использованные — в приоритете)"""
+    word = await _pick_lottery_word(db)
+    if word is None:
+        return None
     
-    # Увеличиваем счетчик использования
-    selected_word.times_used += 1
     await db.commit()
+    resource_versions.bump(Resource.LOTTERY_WORDS)
+    return word
+
+
+def _normalize_words(words: List[str], max_length: int) -> List[str]:
+    """Нижний регистр, без пробелов по краям, без пустых, длинных и повторов (порядок сохраняется)"""
+    cleaned = (word.lower().strip() for word in words if word)
+    return list(dict.fromkeys(word for word in cleaned if word and len(word) <= max_length))
+
+
+async def _bulk_upsert_words(db: AsyncSession, model, words: List[str]) -> int:
+    """
+    Добавить слова пачками INSERT ... ON CONFLICT (word) (без коммита).
     
-    return selected_word.word
+    Новые слова вставляются, отключённые ранее — включаются обратно,
+    активные не трогаются. Возвращает, сколько слов стало активными.
+    """
+    if not words:
+        return 0
+    # Список параметров: SQLAlchemy сам режет его на многострочные INSERT ... VALUES
+    # (insertmanyvalues) и собирает RETURNING со всех пачек
+    stmt = (
+        _insert(db, model)
+        .on_conflict_do_update(
+            index_elements=[model.word],
+            set_={"is_active": True},
+            where=model.is_active == False
+        )
+        .returning(model.id)
+    )
+    result = await db.execute(stmt, [{"word": word, "is_active": True} for word in words])
+    return len(result.all())
 
 
 async def bulk_add_lottery_words(db: AsyncSession, words: List[str]) -> int:
     """Массово добавить слова в пул лотереи"""
-    added_count = 0
-    for word in words:
-        word_clean = word.lower().strip()
-        if word_clean:
-            # Проверяем, не существует ли уже
-            result = await db.execute(
-                select(LotteryWordPool).where(
-                    LotteryWordPool.word == word_clean,
-                    LotteryWordPool.is_active == True
-                )
-            )
-            existing = result.scalar_one_or_none()
-            if not existing:
-                await add_lottery_word(db, word_clean)
-                added_count += 1
-    
+    words = _normalize_words(words, LotteryWordPool.word.type.length)
+    added_count = await _bulk_upsert_words(db, LotteryWordPool, words)
+    await db.commit()
+    if added_count:
+        resource_versions.bump(Resource.LOTTERY_WORDS)
     return added_count
 
 
 # === Stats ===
 
-async def get_admin_stats(db: AsyncSession) -> dict:
-    """Статистика для админки"""
-    total_players = await get_players_count(db)
-    online_players = await get_online_players_count(db)
-    total_games = await get_total_games_played(db)
-    total_balance = await get_total_balance(db)
-    
-    # Количество банов
-    total_bans = await db.execute(select(func.count(BanHistory.id)))
-    total_bans = total_bans.scalar() or 0
-    
-    # Активные баны
-    active_bans = await db.execute(
-        select(func.count(Player.id)).where(Player.is_banned == True)
+admin_stats_cache = TTLCache(ttl=settings.admin_stats_cache_seconds)
+
+
+async def _count_platform_stats(db: AsyncSession) -> dict:
+    """Посчитать счётчики платформы по живым таблицам одним запросом"""
+    total_bans = select(func.count(BanHistory.id)).scalar_subquery()
+    global_banwords_count = (
+        select(func.count(GlobalBanword.id))
+        .where(GlobalBanword.is_active == True)
+        .scalar_subquery()
     )
-    active_bans = active_bans.scalar() or 0
-    
-    # Количество банвордов
-    global_banwords_count = await db.execute(
-        select(func.count(GlobalBanword.id)).where(GlobalBanword.is_active == True)
+    weekly_banwords_count = (
+        select(func.count(WeeklyBanword.id))
+        .where(WeeklyBanword.is_active == True)
+        .scalar_subquery()
     )
-    global_banwords_count = global_banwords_count.scalar() or 0
     
-    weekly_banwords_count = await db.execute(
-        select(func.count(WeeklyBanword.id)).where(WeeklyBanword.is_active == True)
+    result = await db.execute(
+        select(
+            func.count(Player.id),
+            func.count(Player.id).filter(Player.is_banned == True),
+            func.coalesce(func.sum(Player.games_played), 0),
+            func.coalesce(func.sum(Player.balance), 0),
+            total_bans,
+            global_banwords_count,
+            weekly_banwords_count,
+        )
     )
-    weekly_banwords_count = weekly_banwords_count.scalar() or 0
+    row = result.one()
     
     return {
-        "total_players": total_players,
-        "online_players": online_players,
-        "banned_players": active_bans,
-        "total_games": total_games,
-        "total_balance": total_balance,
-        "total_bans": total_bans,
-        "global_banwords": global_banwords_count,
-        "weekly_banwords": weekly_banwords_count,
+        CounterKey.TOTAL_PLAYERS: row[0] or 0,
+        CounterKey.ACTIVE_BANS: row[1] or 0,
+        CounterKey.TOTAL_GAMES: row[2] or 0,
+        CounterKey.TOTAL_BALANCE: row[3] or 0,
+        CounterKey.TOTAL_BANS: row[4] or 0,
+        CounterKey.GLOBAL_BANWORDS: row[5] or 0,
+        CounterKey.WEEKLY_BANWORDS: row[6] or 0,
     }
 
 
+async def reconcile_platform_counters(db: AsyncSession) -> dict:
+    """
+    Пересчитать счётчики платформы и исправить накопившийся дрейф
+    
+    Счётчики переписываются на месте. В Postgres таблица счётчиков на время
+    пересчёта блокируется от записи: _bump_counters ждёт, а не теряется
+    между подсчётом и записью.
+    """
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(text("LOCK TABLE platform_counters IN EXCLUSIVE MODE"))
+    
+    actual = await _count_platform_stats(db)
+    result = await db.execute(select(PlatformCounter.key, PlatformCounter.value))
+    stored = dict(result.all())
+    drift = {key: value - stored[key] for key, value in actual.items() if key in stored}
+    
+    changed = {key: value for key, value in actual.items() if drift.get(key)}
+    if changed:
+        await db.execute(
+            update(PlatformCounter)
+            .where(PlatformCounter.key.in_(list(changed)))
+            .values(value=case(changed, value=PlatformCounter.key))
+        )
+    missing = [key for key in actual if key not in stored]
+    if missing:
+        await db.execute(
+            _insert(db, PlatformCounter).on_conflict_do_nothing(index_elements=[PlatformCounter.key]),
+            [{"key": key, "value": actual[key]} for key in missing]
+        )
+    await db.commit()
+    admin_stats_cache.clear()
+    resource_versions.bump(Resource.STATS)
+    return {key: delta for key, delta in drift.items() if delta}
+
+
+async def ensure_platform_counters(db: AsyncSession):
+    """Завести счётчики платформы, если их ещё нет (полный пересчёт только в этом случае)"""
+    result = await db.execute(select(func.count()).select_from(PlatformCounter))
+    if result.scalar_one() < len(CounterKey.ALL):
+        await reconcile_platform_counters(db)
+
+
+async def _compute_admin_stats(db: AsyncSession) -> dict:
+    """Собрать статистику из счётчиков платформы"""
+    result = await db.execute(select(PlatformCounter.key, PlatformCounter.value))
+    counters = dict(result.all())
+    if len(counters) < len(CounterKey.ALL):
+        # Счётчики ещё не заведены — считаем по таблицам (только чтение)
+        counters = await _count_platform_stats(db)
+    
+    return {
+        "total_players": counters[CounterKey.TOTAL_PLAYERS],
+        "online_players": await get_online_players_count(db),
+        "banned_players": counters[CounterKey.ACTIVE_BANS],
+        "total_games": counters[CounterKey.TOTAL_GAMES],
+        "total_balance": counters[CounterKey.TOTAL_BALANCE],
+        "total_bans": counters[CounterKey.TOTAL_BANS],
+        "global_banwords": counters[CounterKey.GLOBAL_BANWORDS],
+        "weekly_banwords": counters[CounterKey.WEEKLY_BANWORDS],
+    }
+
+
+async def get_admin_stats() -> dict:
+    """Статистика для админки (кэшируется на несколько секунд)"""
+    async def compute():
+        # Своя сессия: расчёт общий для всех ожидающих запросов и может пережить первый из них
+        async with async_session_maker() as db:
+            return await _compute_admin_stats(db)
+    
+    return await admin_stats_cache.get_or_compute("admin_stats", compute)
+
+
 # === Global Banwords CRUD ===
 
 async def get_all_global_banwords(db: AsyncSession) -> List[GlobalBanword]:
@@ -468,11 +996,24 @@ async def create_global_banword(db: AsyncSession, word: str) -> GlobalBanword:
     """Создать глобальный банворд"""
     banword = GlobalBanword(word=word.lower().strip())
     db.add(banword)
+    await _bump_counters(db, global_banwords=1)
     await db.commit()
+    resource_versions.bump(Resource.GLOBAL_BANWORDS)
     await db.refresh(banword)
     return banword
 
 
+async def bulk_add_global_banwords(db: AsyncSession, words: List[str]) -> int:
+    """Массово добавить глобальные банворды"""
+    words = _normalize_words(words, GlobalBanword.word.type.length)
+    added_count = await _bulk_upsert_words(db, GlobalBanword, words)
+    await _bump_counters(db, global_banwords=added_count)
+    await db.commit()
+    if added_count:
+        resource_versions.bump(Resource.GLOBAL_BANWORDS)
+    return added_count
+
+
 async def delete_global_banword(db: AsyncSession, banword_id: int) -> bool:
     """Удалить глобальный банворд"""
     result = await db.execute(
@@ -480,12 +1021,88 @@ async def delete_global_banword(db: AsyncSession, banword_id: int) -> bool:
     )
     banword = result.scalar_one_or_none()
     if banword:
+        if banword.is_active:
+            await _bump_counters(db, global_banwords=-1)
         banword.is_active = False
         await db.commit()
+        resource_versions.bump(Resource.GLOBAL_BANWORDS)
         return True
     return False
 
 
+# === Word Lists ===
+
+PERSONAL_WORD_MAX_LENGTH = 100
+
+
+async def bulk_add_personal_banwords(db: AsyncSession, pairs: List[tuple]) -> int:
+    """Добавить личные банворды игрокам по парам (telegram_id, слово). Неизвестные игроки пропускаются"""
+    by_player: dict[int, List[str]] = {}
+    for telegram_id, word in pairs:
+        by_player.setdefault(telegram_id, []).append(word)
+    if not by_player:
+        return 0
+    
+    result = await db.execute(select(Player).where(Player.telegram_id.in_(list(by_player))))
+    changed = []
+    added_count = 0
+    for player in result.scalars().all():
+        current = list(player.personal_banwords or [])
+        existing = set(current)
+        new_words = [
+            word for word in _normalize_words(by_player[player.telegram_id], PERSONAL_WORD_MAX_LENGTH)
+            if word not in existing
+        ]
+        if new_words:
+            player.personal_banwords = current + new_words
+            changed.append(player)
+            added_count += len(new_words)
+    
+    await db.commit()
+    for player in changed:
+        _player_changed(player)
+    return added_count
+
+
+WORD_SET_EXPORT_COLUMNS = {
+    WordSet.GLOBAL: ("word", "times_triggered", "created_at"),
+    WordSet.WEEKLY: ("word", "week_number", "expires_at"),
+    WordSet.LOTTERY: ("word", "times_used", "created_at"),
+    WordSet.PERSONAL: ("telegram_id", "word"),
+}
+
+
+async def stream_word_set(db: AsyncSession, word_set: str) -> AsyncIterator[tuple]:
+    """Строки набора слов (колонки — WORD_SET_EXPORT_COLUMNS) курсором, без загрузки в память"""
+    if word_set == WordSet.PERSONAL:
+        stmt = (
+            select(Player.telegram_id, Player.personal_banwords)
+            .order_by(Player.id)
+            .execution_options(yield_per=1000)
+        )
+        result = await db.stream(stmt)
+        async for telegram_id, words in result:
+            for word in words or ():
+                yield telegram_id, word
+        return
+    
+    model = {
+        WordSet.GLOBAL: GlobalBanword,
+        WordSet.WEEKLY: WeeklyBanword,
+        WordSet.LOTTERY: LotteryWordPool,
+    }[word_set]
+    columns = [getattr(model, name) for name in WORD_SET_EXPORT_COLUMNS[word_set]]
+    stmt = (
+        select(*columns)
+        .where(model.is_active == True)
+        .order_by(model.id)
+        .execution_options(yield_per=1000)
+    )
+    result = await db.stream(stmt)
+    async for row in result:
+        yield tuple(row)
+
+
 # === Chat Settings CRUD ===
 
 async def get_chat_settings(db: AsyncSession, chat_id: int) -> Optional[ChatSettings]:
@@ -534,13 +1151,12 @@ async def get_all_chats_for_notifications(db: AsyncSession) -> List[ChatSettings
 
 # === Weekly Lottery ===
 
-async def start_new_weekly_lottery(db: AsyncSession, word: str) -> WeeklyBanword:
-    """Начать новую еженедельную лотерею"""
-    import calendar
+async def _replace_weekly_word(db: AsyncSession, word: str) -> WeeklyBanword:
+    """Деактивировать старые слова недели и добавить новое (без коммита)"""
     from datetime import date
     
     # Деактивируем все старые слова недели
-    await db.execute(
+    deactivated = await db.execute(
         update(WeeklyBanword).where(WeeklyBanword.is_active == True).values(is_active=False)
     )
     
@@ -553,7 +1169,28 @@ async def start_new_weekly_lottery(db: AsyncSession, word: str) -> WeeklyBanword
         expires_at=datetime.utcnow() + timedelta(days=7)
     )
     db.add(banword)
+    await _bump_counters(db, weekly_banwords=1 - deactivated.rowcount)
+    return banword
+
+
+async def start_new_weekly_lottery(db: AsyncSession, word: str) -> WeeklyBanword:
+    """Начать новую еженедельную лотерею"""
+    banword = await _replace_weekly_word(db, word)
+    await db.commit()
+    resource_versions.bump(Resource.WEEKLY_BANWORDS)
+    await db.refresh(banword)
+    return banword
+
+
+async def roll_weekly_lottery(db: AsyncSession) -> Optional[WeeklyBanword]:
+    """Разыграть слово недели из пула лотереи одной транзакцией. None — пул пуст"""
+    word = await _pick_lottery_word(db)
+    if word is None:
+        return None
+    
+    banword = await _replace_weekly_word(db, word)
     await db.commit()
+    resource_versions.bump(Resource.WEEKLY_BANWORDS, Resource.LOTTERY_WORDS)
     await db.refresh(banword)
     return banword
 
@@ -1,22 +1,77 @@
+import asyncio
+import time
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import ssl
 from app.config import settings
+from app.metrics import instrument_engine, record_pool_checkout
 
-# Убираем sslmode из URL если есть (asyncpg не понимает его)
-database_url = settings.database_url
-if "?" in database_url:
-    database_url = database_url.split("?")[0]
+def _clean_url(url: str) -> str:
+    """Убираем sslmode из URL если есть (asyncpg не понимает его)"""
+    if "?" in url:
+        url = url.split("?")[0]
+    return url
+
+
+database_url = _clean_url(settings.database_url)
 
 # Создаём SSL контекст для Neon
 ssl_context = ssl.create_default_context()
 
-engine = create_async_engine(
-    database_url,
-    echo=False,
-    pool_pre_ping=True,
-    connect_args={"ssl": ssl_context}
-)
+
+class _TimedQueuePool(AsyncAdaptedQueuePool):
+    """Пул, который замеряет ожидание соединения (включая открытие нового)"""
+    
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            record_pool_checkout(self._orig_logging_name or "primary", time.perf_counter() - started)
+
+
+def _create_engine(url: str, name: str):
+    """Создать движок с настройками пула из Settings"""
+    if url.startswith("sqlite"):
+        # Локальная разработка и нагрузочные тесты: без SSL и настроек пула
+        return create_async_engine(
+            url, echo=False, poolclass=_TimedQueuePool, pool_logging_name=name
+        )
+    
+    # Кэш подготовленных выражений: asyncpg и SQLAlchemy держат каждый свой.
+    # За pgbouncer / пулером Neon оба нужно выключить (DB_STATEMENT_CACHE_SIZE=0)
+    url = make_url(url).update_query_dict(
+        {"prepared_statement_cache_size": str(settings.db_statement_cache_size)}
+    )
+    return create_async_engine(
+        url,
+        echo=False,
+        poolclass=_TimedQueuePool,
+        pool_logging_name=name,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args={
+            "ssl": ssl_context,
+            "statement_cache_size": settings.db_statement_cache_size,
+        }
+    )
+
+
+engine = _create_engine(database_url, "primary")
+instrument_engine(engine, "primary")
+
+# Реплика для чтения; без DATABASE_READ_URL всё идёт в основную БД
+if settings.database_read_url:
+    read_engine = _create_engine(_clean_url(settings.database_read_url), "replica")
+    instrument_engine(read_engine, "replica")
+else:
+    read_engine = engine
 
 async_session_maker = async_sessionmaker(
     engine, 
@@ -24,6 +79,12 @@ async_session_maker = async_sessionmaker(
     expire_on_commit=False
 )
 
+async_read_session_maker = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
@@ -35,6 +96,33 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+async def get_read_db() -> AsyncSession:
+    """
+    Сессия только для чтения (реплика). Не для read-your-writes
+    
+    И не для ответов с ETag: версия ресурса растёт сразу после коммита
+    на primary, и отстающая реплика закэшировала бы у клиента старое тело
+    под новым ETag.
+    """
+    async with async_read_session_maker() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
 async def init_db():
+    """Создать таблицы без миграций (для локальных SQLite-прогонов)"""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+
+
+async def warmup_db(connections: int):
+    """Открыть соединения пула до первых запросов"""
+    async def ping(target):
+        async with target.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    
+    engines = [engine] if read_engine is engine else [engine, read_engine]
+    # Одновременно, чтобы пул открыл именно столько разных соединений
+    await asyncio.gather(*(ping(e) for e in engines for _ in range(connections)))
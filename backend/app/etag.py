@@ -0,0 +1,70 @@
+import secrets
+import time
+from collections import defaultdict
+from typing import Optional
+
+from fastapi import Request, Response
+
+
+class ResourceVersions:
+    """
+    Версии ресурсов для ETag.
+
+    Вместо хэша тела ответа ETag собирается из счётчика версии, который
+    увеличивается после каждого коммита, меняющего ресурс. Эпоха процесса
+    в ETag не даёт совпасть версиям после перезапуска.
+    """
+
+    def __init__(self):
+        self._epoch = secrets.token_hex(4)
+        self._versions: dict[str, int] = defaultdict(int)
+
+    def bump(self, *names: str):
+        """Отметить, что ресурсы изменились (вызывать после commit)"""
+        for name in names:
+            self._versions[name] += 1
+
+    def etag(self, name: str, *parts) -> str:
+        suffix = "".join(f"-{part}" for part in parts)
+        return f'W/"{name}-{self._epoch}-{self._versions[name]}{suffix}"'
+
+
+# Версии живут в памяти и растут только в процессе, который сделал коммит.
+# Бэкенд рассчитан на один процесс (см. render.yaml: --workers 1, numInstances: 1):
+# у второго воркера или инстанса версии не узнают о чужих изменениях, и клиенты,
+# получившие ETag от него, будут получать 304 на устаревшие данные. В памяти
+# процесса живут и рейтинг, и кэши игроков — масштабировать бэкенд можно, только
+# переведя всё это на общее состояние (например, версии в platform_counters).
+resource_versions = ResourceVersions()
+
+
+class Resource:
+    GLOBAL_BANWORDS = "global_banwords"
+    WEEKLY_BANWORDS = "weekly_banwords"
+    LOTTERY_WORDS = "lottery_words"
+    LEADERBOARD = "leaderboard"
+    STATS = "stats"
+
+
+def time_bucket(seconds: float) -> int:
+    """Номер интервала времени — для ресурсов, которые меняются без явных событий"""
+    return int(time.time() // max(seconds, 1))
+
+
+def etag_headers(etag: str) -> dict:
+    # no-cache: браузер хранит ответ, но каждый раз перепроверяет его по ETag
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def conditional_get(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Проставить ETag и вернуть 304, если у клиента актуальная версия.
+
+    Роут возвращает результат как есть, если он не None.
+    """
+    headers = etag_headers(etag)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
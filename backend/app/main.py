@@ -1,24 +1,41 @@
-from fastapi import FastAPI
+import asyncio
+from typing import Optional
+from fastapi import Depends, FastAPI, Header, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
 
-from app.database import init_db
+from app.responses import ORJSONResponse
+from app.database import warmup_db, async_session_maker
+from app.config import settings
+from app.crud import ensure_platform_counters
+from app.presence import presence_tracker
+from app import metrics
 from app.routers import auth_router, players_router, admin_router
+from app.routers.admin import verify_admin_token
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
-    await init_db()
+    # Startup (схему накатывает `alembic upgrade head` перед запуском)
+    if settings.db_pool_warmup:
+        await warmup_db(settings.db_pool_size)
+    async with async_session_maker() as db:
+        await ensure_platform_counters(db)
+    presence_task = asyncio.create_task(presence_tracker.run(async_session_maker))
     yield
     # Shutdown
-    pass
+    presence_task.cancel()
+    async with async_session_maker() as db:
+        await presence_tracker.flush(db)
 
 
 app = FastAPI(
     title="SQWOZ Games API",
     description="API для мини-игр SQWOZ с системой банов",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -34,8 +51,35 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"],
 )
 
+# Сжатие ответов больше gzip_minimum_size байт (списки банвордов, игроков)
+app.add_middleware(GZipMiddleware, minimum_size=settings.gzip_minimum_size)
+
+
+@app.middleware("http")
+async def collect_request_metrics(request: Request, call_next):
+    """Время запроса, число и время SQL-запросов, ожидание пула"""
+    stats = metrics.start_request()
+    try:
+        response = await call_next(request)
+    except Exception:
+        metrics.observe_request(request.method, _route_template(request), 500, stats)
+        raise
+    route = _route_template(request)
+    metrics.observe_request(request.method, route, response.status_code, stats)
+    response.headers["Server-Timing"] = stats.server_timing()
+    metrics.check_query_budget(request.scope.get("endpoint"), request.method, route, stats)
+    return response
+
+
+def _route_template(request: Request) -> str:
+    # Шаблон пути (/players/{telegram_id}/stats), а не сам путь — иначе метки не ограничены
+    route = request.scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
 # Routers
 app.include_router(auth_router)
 app.include_router(players_router)
@@ -56,6 +100,17 @@ async def health_check():
     return {"status": "healthy"}
 
 
-@app.get("/health")
-async def health():
-    return {"status": "ok"}
+def verify_metrics_access(
+    authorization: Optional[str] = Header(None),
+    x_admin_password: Optional[str] = Header(None)
+):
+    """Доступ к метрикам: токен скрейпера (Authorization: Bearer) или админский пароль"""
+    if settings.metrics_token and authorization == f"Bearer {settings.metrics_token}":
+        return True
+    return verify_admin_token(x_admin_password)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(_: bool = Depends(verify_metrics_access)):
+    """Метрики процесса в формате Prometheus"""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,195 @@
+import os
+import sys
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+import greenlet
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+from app.prometheus import MetricsRegistry
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP-запросы по маршруту и статусу", ("method", "route", "status")
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Время обработки запроса", ("method", "route")
+)
+http_request_db_queries = registry.histogram(
+    "http_request_db_queries", "SQL-запросов на один HTTP-запрос", ("method", "route"),
+    buckets=(0, 1, 2, 3, 4, 6, 8, 12, 16, 25, 50)
+)
+http_request_db_seconds = registry.histogram(
+    "http_request_db_seconds", "Время в SQL за один HTTP-запрос", ("method", "route")
+)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "Время выполнения SQL-запроса", ("engine",)
+)
+http_query_budget_exceeded = registry.counter(
+    "http_query_budget_exceeded_total", "Запросы, превысившие бюджет SQL-запросов", ("method", "route")
+)
+db_slow_queries = registry.counter(
+    "db_slow_queries_total", "SQL-запросы дольше SLOW_QUERY_MS", ("engine",)
+)
+db_pool_checkout = registry.histogram(
+    "db_pool_checkout_seconds", "Ожидание соединения из пула", ("engine",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+)
+
+
+class RequestStats:
+    """Счётчики текущего HTTP-запроса (живут в contextvar)"""
+
+    __slots__ = ("started_at", "queries", "db_seconds", "pool_seconds")
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.pool_seconds = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def server_timing(self) -> str:
+        return (
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} queries", '
+            f"pool;dur={self.pool_seconds * 1000:.1f}, "
+            f"app;dur={self.elapsed * 1000:.1f}"
+        )
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def start_request() -> RequestStats:
+    """Завести счётчики для нового запроса"""
+    stats = RequestStats()
+    _request_stats.set(stats)
+    return stats
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+def observe_request(method: str, route: str, status_code: int, stats: RequestStats):
+    """Записать итоги запроса в метрики процесса"""
+    http_requests.inc(method=method, route=route, status=status_code)
+    http_request_duration.observe(stats.elapsed, method=method, route=route)
+    http_request_db_queries.observe(stats.queries, method=method, route=route)
+    http_request_db_seconds.observe(stats.db_seconds, method=method, route=route)
+
+
+def record_pool_checkout(engine_name: str, seconds: float):
+    db_pool_checkout.observe(seconds, engine=engine_name)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.pool_seconds += seconds
+
+
+def instrument_engine(engine: AsyncEngine, name: str):
+    """Считать SQL-запросы движка: общее время и счётчики текущего запроса"""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started_at"].pop()
+        db_query_duration.observe(elapsed, engine=name)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+        if settings.slow_query_ms and elapsed * 1000 >= settings.slow_query_ms:
+            db_slow_queries.inc(engine=name)
+            _log_slow_query(elapsed, statement, parameters, executemany)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        # Упавший запрос не дойдёт до after_cursor_execute
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started_at"):
+            conn.info["query_started_at"].pop()
+
+    _instrumented_engines[name] = engine
+
+
+_instrumented_engines: dict[str, AsyncEngine] = {}
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_SKIP_FILES = {os.path.abspath(__file__), os.path.join(_APP_DIR, "database.py")}
+
+
+def _call_site() -> str:
+    """Первый кадр кода приложения, из которого пришёл запрос"""
+    frames = [sys._getframe(1)]
+    # Под AsyncSession SQL выполняется в дочернем greenlet, а код crud/роутеров
+    # остаётся в родительском — его кадры ищем там
+    parent = greenlet.getcurrent().parent
+    if parent is not None and parent.gr_frame is not None:
+        frames.append(parent.gr_frame)
+    for frame in frames:
+        while frame is not None:
+            filename = os.path.abspath(frame.f_code.co_filename)
+            if filename.startswith(_APP_DIR) and filename not in _SKIP_FILES:
+                return f"{os.path.relpath(filename, os.path.dirname(_APP_DIR))}:{frame.f_lineno} in {frame.f_code.co_name}"
+            frame = frame.f_back
+    return "?"
+
+
+def _log_slow_query(elapsed: float, statement: str, parameters, executemany: bool):
+    if executemany:
+        parameters = f"{len(parameters)} наборов, первый: {parameters[0] if parameters else None}"
+    statement = " ".join(statement.split())
+    print(f"[sql] Медленный запрос {elapsed * 1000:.0f} мс ({_call_site()}): {statement} | {parameters}")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Эндпоинт сделал больше SQL-запросов, чем объявлено в query_budget"""
+
+
+def query_budget(max_queries: int):
+    """
+    Объявить, сколько SQL-запросов может сделать эндпоинт.
+    
+    Проверяется middleware метрик: превышение считается в метрике и пишется
+    в лог, а с QUERY_BUDGET_ENFORCE=true запрос падает с QueryBudgetExceeded.
+    """
+    def decorator(endpoint):
+        endpoint.query_budget = max_queries
+        return endpoint
+    return decorator
+
+
+def check_query_budget(endpoint, method: str, route: str, stats: RequestStats):
+    budget = getattr(endpoint, "query_budget", None)
+    if budget is None or stats.queries <= budget:
+        return
+    http_query_budget_exceeded.inc(method=method, route=route)
+    message = f"{method} {route}: {stats.queries} SQL-запросов при бюджете {budget}"
+    if settings.query_budget_enforce:
+        raise QueryBudgetExceeded(message)
+    print(f"[sql] Превышен бюджет запросов: {message}")
+
+
+def _pool_state() -> dict:
+    state = {}
+    for name, engine in _instrumented_engines.items():
+        pool = engine.sync_engine.pool
+        if hasattr(pool, "checkedout"):
+            state[(name, "checked_out")] = pool.checkedout()
+            state[(name, "idle")] = pool.checkedin()
+    return state
+
+
+registry.gauge("db_pool_connections", "Соединения пула", ("engine", "state"), _pool_state)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, BigInteger, String, Text, Float, DateTime, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Float, Date, DateTime, Boolean, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -37,11 +37,21 @@ class Player(Base):
     # Даты
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
-    last_active_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_active_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     
     # Relationships
     ban_history = relationship("BanHistory", back_populates="player")
     game_sessions = relationship("GameSession", back_populates="player")
+    
+    __table_args__ = (
+        # Лидерборд, рейтинг и keyset-пагинация: ORDER BY balance DESC, id DESC
+        Index("ix_players_balance_id", "balance", "id"),
+        # Поиск по началу username; text_pattern_ops — чтобы LIKE 'abc%' шёл по индексу при любой collation
+        Index(
+            "ix_players_username_lower", func.lower(username).label("username_lower"),
+            postgresql_ops={"username_lower": "text_pattern_ops"}
+        ),
+    )
 
 
 class BanHistory(Base):
@@ -65,6 +75,11 @@ class BanHistory(Base):
     paid_at = Column(DateTime(timezone=True), nullable=True)
     
     player = relationship("Player", back_populates="ban_history")
+    
+    __table_args__ = (
+        # Последний неоплаченный бан игрока и история банов
+        Index("ix_ban_history_player_paid_created", "player_id", "was_paid", "created_at"),
+    )
 
 
 class GameSession(Base):
@@ -83,6 +98,49 @@ class GameSession(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     player = relationship("Player", back_populates="game_sessions")
+    
+    __table_args__ = (
+        Index("ix_game_sessions_player_created", "player_id", "created_at"),
+        # Для удаления старых сессий по сроку хранения
+        Index("ix_game_sessions_created_at", "created_at"),
+    )
+
+
+class GameSessionDaily(Base):
+    """
+    Итоги игр игрока за день по каждому типу игры.
+
+    Обновляется при каждом сохранении игры, поэтому сырые game_sessions
+    старше game_sessions_retention_days можно удалять без потери статистики.
+    """
+    __tablename__ = "game_session_daily"
+    
+    player_id = Column(Integer, ForeignKey("players.id"), primary_key=True)
+    game_type = Column(String(50), primary_key=True)
+    day = Column(Date, primary_key=True)  # UTC
+    
+    plays = Column(Integer, nullable=False, default=0)
+    wins = Column(Integer, nullable=False, default=0)
+    total_bet = Column(BigInteger, nullable=False, default=0)
+    total_win = Column(BigInteger, nullable=False, default=0)
+    best_score = Column(Integer, nullable=False, default=0)
+
+
+class PlayerGameStats(Base):
+    """Статистика игрока по типу игры за всё время (обновляется при сохранении игры)"""
+    __tablename__ = "player_game_stats"
+    
+    player_id = Column(Integer, ForeignKey("players.id"), primary_key=True)
+    game_type = Column(String(50), primary_key=True)
+    
+    plays = Column(Integer, nullable=False, default=0)
+    wins = Column(Integer, nullable=False, default=0)
+    net_profit = Column(BigInteger, nullable=False, default=0)  # сумма win_amount - bet_amount
+    best_score = Column(Integer, nullable=False, default=0)
+    current_streak = Column(Integer, nullable=False, default=0)  # побед подряд сейчас
+    best_streak = Column(Integer, nullable=False, default=0)
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 
 class GlobalSettings(Base):
@@ -108,6 +166,14 @@ class WeeklyBanword(Base):
     
     # Статистика
     times_triggered = Column(Integer, default=0)  # Сколько раз сработало
+    
+    __table_args__ = (
+        # Активные слова недели (обычно одно) — частичный индекс
+        Index(
+            "ix_weekly_banwords_active_created", "created_at",
+            postgresql_where=is_active.is_(True), sqlite_where=is_active.is_(True)
+        ),
+    )
 
 
 class GlobalBanword(Base):
@@ -119,6 +185,13 @@ class GlobalBanword(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     times_triggered = Column(Integer, default=0)
+    
+    __table_args__ = (
+        Index(
+            "ix_global_banwords_active_word", "word",
+            postgresql_where=is_active.is_(True), sqlite_where=is_active.is_(True)
+        ),
+    )
 
 
 class ChatSettings(Base):
@@ -151,7 +224,38 @@ class LotteryWordPool(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Статистика использования
-    times_used = Column(Integer, default=0)  # Сколько раз было выбрано для лотереи
+    times_used = Column(Integer, nullable=False, default=0, server_default="0")  # Сколько раз было выбрано для лотереи
+    
+    __table_args__ = (
+        Index(
+            "ix_lottery_word_pool_active_used_id", "times_used", "id",
+            postgresql_where=is_active.is_(True), sqlite_where=is_active.is_(True)
+        ),
+    )
+
+
+class PlatformCounter(Base):
+    """Счётчики платформы для статистики админки"""
+    __tablename__ = "platform_counters"
+    
+    key = Column(String(50), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class CounterKey:
+    TOTAL_PLAYERS = "total_players"
+    TOTAL_BALANCE = "total_balance"
+    TOTAL_GAMES = "total_games"
+    TOTAL_BANS = "total_bans"
+    ACTIVE_BANS = "active_bans"
+    GLOBAL_BANWORDS = "global_banwords"
+    WEEKLY_BANWORDS = "weekly_banwords"
+    
+    ALL = (
+        TOTAL_PLAYERS, TOTAL_BALANCE, TOTAL_GAMES, TOTAL_BANS,
+        ACTIVE_BANS, GLOBAL_BANWORDS, WEEKLY_BANWORDS,
+    )
 
 
 # Длительность бана в часах по множителю
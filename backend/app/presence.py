@@ -0,0 +1,94 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import update, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.models import Player
+
+
+class PresenceTracker:
+    """
+    Активность игроков в памяти процесса.
+
+    Запросы только отмечают время в словаре, а last_active_at пишется в БД
+    пачками: не чаще одного раза в presence_flush_seconds на игрока.
+    """
+
+    def __init__(self, flush_interval: float, keep_minutes: int = 60):
+        self.flush_interval = timedelta(seconds=flush_interval)
+        self.keep = timedelta(minutes=keep_minutes)
+        self._seen: dict[int, datetime] = {}  # telegram_id -> последняя активность
+        # telegram_id -> (записанное значение, когда записали)
+        self._flushed: dict[int, tuple[datetime, datetime]] = {}
+        self._started_at = datetime.utcnow()
+
+    def touch(self, telegram_id: int):
+        """Отметить активность игрока"""
+        self._seen[telegram_id] = datetime.utcnow()
+
+    def online_count(self, minutes: int = 15) -> Optional[int]:
+        """
+        Количество игроков, активных за последние N минут.
+
+        Возвращает None, пока трекер работает меньше N минут —
+        тогда честный ответ есть только в БД.
+        """
+        now = datetime.utcnow()
+        if now - self._started_at < timedelta(minutes=minutes):
+            return None
+        threshold = now - timedelta(minutes=minutes)
+        return sum(1 for seen_at in self._seen.values() if seen_at >= threshold)
+
+    def _pending(self, now: datetime) -> list[dict]:
+        pending = []
+        for telegram_id, seen_at in self._seen.items():
+            flushed = self._flushed.get(telegram_id)
+            if flushed is None:
+                pending.append({"tid": telegram_id, "ts": seen_at})
+                continue
+            value, written_at = flushed
+            if seen_at > value and now - written_at >= self.flush_interval:
+                pending.append({"tid": telegram_id, "ts": seen_at})
+        return pending
+
+    def _prune(self, now: datetime):
+        threshold = now - self.keep
+        for telegram_id in [t for t, seen_at in self._seen.items() if seen_at < threshold]:
+            flushed = self._flushed.get(telegram_id)
+            if flushed and flushed[0] == self._seen[telegram_id]:
+                del self._seen[telegram_id]
+                del self._flushed[telegram_id]
+
+    async def flush(self, db: AsyncSession) -> int:
+        """Записать накопленную активность в БД одним executemany"""
+        now = datetime.utcnow()
+        pending = self._pending(now)
+        if pending:
+            table = Player.__table__
+            await db.execute(
+                update(table)
+                .where(table.c.telegram_id == bindparam("tid"))
+                .values(last_active_at=bindparam("ts")),
+                pending
+            )
+            await db.commit()
+            for item in pending:
+                self._flushed[item["tid"]] = (item["ts"], now)
+        self._prune(now)
+        return len(pending)
+
+    async def run(self, session_maker: async_sessionmaker):
+        """Фоновый цикл записи активности"""
+        while True:
+            await asyncio.sleep(self.flush_interval.total_seconds())
+            try:
+                async with session_maker() as db:
+                    await self.flush(db)
+            except Exception as e:
+                print(f"[presence] Ошибка записи активности: {e}")
+
+
+presence_tracker = PresenceTracker(flush_interval=settings.presence_flush_seconds)
@@ -0,0 +1,145 @@
+import asyncio
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class ProfilerBusy(RuntimeError):
+    """Профилирование уже запущено"""
+
+
+class Profile:
+    """Результат: сколько раз встретился каждый стек (от корня к листу)"""
+
+    def __init__(self, stacks: Counter, samples: int, duration: float):
+        self.stacks = stacks
+        self.samples = samples
+        self.duration = duration
+
+    def folded(self) -> str:
+        """Формат folded stacks: flamegraph.pl, speedscope, inferno"""
+        return "".join(
+            f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+    def top(self, limit: int = 10) -> list:
+        """Функции с наибольшим собственным временем: [(кадр, доля сэмплов)]"""
+        own = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+        total = sum(own.values()) or 1
+        return [(frame, count / total) for frame, count in own.most_common(limit)]
+
+
+class SamplingProfiler:
+    """
+    Сэмплирующий CPU-профайлер.
+
+    На Unix работает по SIGPROF (ITIMER_PROF): обработчик сигнала снимает стек
+    главного потока — там event loop, хендлеры и ORM — и сэмплы идут только
+    пока процесс тратит CPU. Таймер считает CPU всех потоков, а стек снимается
+    только с главного: время рабочих потоков (asyncio.to_thread, bcrypt)
+    припишется тому, что в этот момент делал event loop. Для них — threads=True
+    или платформа без SIGPROF: раз в interval снимаются стеки всех потоков
+    через sys._current_frames (по стенным часам, включая простой).
+    Пока профилирование не запущено, ничего не стоит.
+
+    base_dir — корень проекта: пути файлов в кадрах пишутся относительно него.
+    """
+
+    def __init__(self, base_dir: str):
+        self.base_dir = base_dir
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    async def profile(self, seconds: float, interval: float = 0.01, threads: bool = False) -> Profile:
+        """Профилировать процесс seconds секунд, не блокируя event loop"""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("Профилирование уже идёт")
+        try:
+            if (
+                not threads
+                and hasattr(signal, "setitimer")
+                and threading.current_thread() is threading.main_thread()
+            ):
+                return await self._profile_signal(seconds, interval)
+            return await asyncio.to_thread(self._sample_threads, seconds, interval)
+        finally:
+            self._lock.release()
+
+    async def _profile_signal(self, seconds: float, interval: float) -> Profile:
+        stacks = Counter()
+        labels = {}  # код -> подпись кадра (кэш, чтобы не собирать строки на каждом сэмпле)
+
+        def on_sigprof(signum, frame):
+            stacks[_stack(frame, labels, "MainThread", self.base_dir)] += 1
+
+        previous = signal.signal(signal.SIGPROF, on_sigprof)
+        signal.setitimer(signal.ITIMER_PROF, interval, interval)
+        started = time.perf_counter()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, previous)
+        return Profile(stacks, sum(stacks.values()), time.perf_counter() - started)
+
+    def _sample_threads(self, seconds: float, interval: float) -> Profile:
+        # Пока главный поток держит GIL, сэмплер ждёт, поэтому короткие
+        # CPU-всплески между await недоучитываются — это запасной вариант
+        own_thread = threading.get_ident()
+        stacks = Counter()
+        labels = {}
+        samples = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+        while True:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_thread:
+                    stacks[_stack(
+                        frame, labels, names.get(thread_id, f"thread-{thread_id}"), self.base_dir
+                    )] += 1
+            samples += 1
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            time.sleep(min(interval, deadline - now))
+        return Profile(stacks, samples, time.perf_counter() - started)
+
+
+def _stack(frame, labels: dict, thread_name: str, base_dir: str) -> tuple:
+    """Стек от корня к листу: имя потока, затем кадры"""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        label = labels.get(code)
+        if label is None:
+            label = labels[code] = _frame_label(code, base_dir)
+        stack.append(label)
+        frame = frame.f_back
+    stack.append(thread_name.replace(" ", "_").replace(";", ":"))
+    stack.reverse()
+    return tuple(stack)
+
+
+def _frame_label(code, base_dir: str) -> str:
+    # Без пробелов и ';' — они разделители в folded stacks
+    filename = code.co_filename
+    parts = filename.replace("\\", "/").split("/")
+    if "site-packages" in parts:
+        filename = "/".join(parts[parts.index("site-packages") + 1:])
+    elif filename.startswith(base_dir):
+        filename = os.path.relpath(filename, base_dir)
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name}@{filename}:{code.co_firstlineno}".replace(" ", "_").replace(";", ":")
+
+
+profiler = SamplingProfiler(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,115 @@
+import asyncio
+from typing import List, Optional, Tuple
+
+from sortedcontainers import SortedList
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Player
+
+
+class BalanceRanking:
+    """
+    Рейтинг игроков по балансу в памяти процесса.
+
+    Держит ключи (-balance, player_id) всех незабаненных игроков в SortedList:
+    место игрока, вставка и удаление — за логарифм, без COUNT(*) по таблице
+    players и без сдвига всего списка на каждое изменение баланса. Порядок
+    совпадает с лидербордом: баланс по убыванию, при равенстве — по id.
+    """
+
+    def __init__(self):
+        self._keys = SortedList()
+        self._entries: dict[int, Tuple[int, int]] = {}  # player_id -> ключ в _keys
+        self._loaded = False
+        self._lock = asyncio.Lock()
+        # Изменения, пришедшие во время загрузки: player_id -> (balance, is_banned)
+        self._pending: Optional[dict[int, Tuple[int, bool]]] = None
+
+    async def ensure_loaded(self, db: AsyncSession):
+        """Загрузить рейтинг из БД при первом обращении"""
+        if self._loaded:
+            return
+        async with self._lock:
+            if self._loaded:
+                return
+            # Коммит после снимка SELECT, но до конца загрузки не попал бы
+            # ни в снимок, ни в рейтинг — такие sync копятся и применяются поверх
+            self._pending = {}
+            try:
+                result = await db.execute(
+                    select(Player.id, Player.balance).where(Player.is_banned == False)
+                )
+                keys = [(-(balance or 0), player_id) for player_id, balance in result.all()]
+                self._keys = SortedList(keys)
+                self._entries = {key[1]: key for key in keys}
+                for player_id, (balance, is_banned) in self._pending.items():
+                    self._apply(player_id, balance, is_banned, 0)
+                self._loaded = True
+            finally:
+                self._pending = None
+
+    def reset(self):
+        """Сбросить рейтинг (перечитается из БД при следующем запросе)"""
+        self._keys = SortedList()
+        self._entries = {}
+        self._loaded = False
+
+    def sync(self, player: Player, top: int = 0) -> bool:
+        """
+        Обновить позицию игрока после изменения баланса или статуса бана
+
+        Возвращает True, если игрок был или стал в первых top местах,
+        то есть изменение могло затронуть топ. Пока рейтинг не загружен,
+        это неизвестно — тоже True.
+        """
+        if not self._loaded:
+            if self._pending is not None:
+                self._pending[player.id] = (player.balance, player.is_banned)
+            return True
+        return self._apply(player.id, player.balance, player.is_banned, top)
+
+    def _apply(self, player_id: int, balance: int, is_banned: bool, top: int) -> bool:
+        old_key = self._entries.get(player_id)
+        was_top = old_key is not None and self._keys.bisect_left(old_key) < top
+        self._discard(player_id)
+        if is_banned:
+            return was_top
+        key = (-(balance or 0), player_id)
+        self._keys.add(key)
+        self._entries[player_id] = key
+        return was_top or self._keys.bisect_left(key) < top
+
+    def _discard(self, player_id: int):
+        key = self._entries.pop(player_id, None)
+        if key is not None:
+            self._keys.discard(key)
+
+    @property
+    def total(self) -> int:
+        return len(self._keys)
+
+    def rank_of(self, player_id: int, balance: int) -> int:
+        """Место игрока (1 — первое). Для забаненных — место, которое он занял бы"""
+        return self._keys.bisect_left((-(balance or 0), player_id)) + 1
+
+    def neighbours(
+        self, player_id: int, balance: int, count: int
+    ) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        """Соседи игрока по рейтингу: (выше, ниже), элементы — (rank, player_id)"""
+        key = (-(balance or 0), player_id)
+        idx = self._keys.bisect_left(key)
+        after = idx + 1 if idx < len(self._keys) and self._keys[idx] == key else idx
+        start = max(0, idx - count)
+        above = [
+            (start + offset + 1, neighbour_id)
+            for offset, (_, neighbour_id) in enumerate(self._keys.islice(start, idx))
+        ]
+        below = [
+            (after + offset + 1, neighbour_id)
+            for offset, (_, neighbour_id) in enumerate(self._keys.islice(after, after + count))
+        ]
+        return above, below
+
+
+balance_ranking = BalanceRanking()
@@ -0,0 +1,18 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON-ответ через orjson.
+
+    Свой класс вместо fastapi.responses.ORJSONResponse: в новых версиях
+    FastAPI тот объявлен устаревшим, а нам он нужен и для ответов,
+    которые роутеры собирают сами из строк запроса.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
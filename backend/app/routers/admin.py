@@ -1,27 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+import csv
+import io
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import datetime
 
-from app.database import get_db
+from app.database import get_db, get_read_db, async_read_session_maker
+from app.metrics import query_budget
+from app.profiler import profiler, ProfilerBusy
+from app.wordlists import (
+    WordSet, ImportFormatError, ImportInProgress, import_registry, iter_record_batches, parse_records
+)
+from app.responses import ORJSONResponse
 from app.auth import verify_admin_password
 from app.config import settings
 from app.models import Player, GlobalBanword
+from app.etag import resource_versions, Resource, conditional_get, time_bucket
 from app.schemas import (
     AdminLoginRequest,
     AdminStatsResponse,
     PlayerResponse,
+    PlayerListItem,
     WeeklyBanwordCreate,
     WeeklyBanwordResponse,
     LotteryWordCreate,
     LotteryWordResponse,
     GlobalBanwordCreate,
     GlobalBanwordResponse,
+    WordListImportResponse,
 )
 from app.crud import (
     get_admin_stats,
     get_all_players,
+    encode_player_cursor,
+    decode_player_cursor,
     get_player_by_id,
     get_player_by_telegram_id,
     set_player_balance,
@@ -34,9 +47,19 @@ from app.crud import (
     remove_lottery_word,
     get_random_lottery_word,
     bulk_add_lottery_words,
+    roll_weekly_lottery,
     get_all_global_banwords,
     create_global_banword,
+    bulk_add_global_banwords,
     delete_global_banword,
+    unban_player,
+    reset_player_to_starting_balance,
+    unban_expired_players,
+    reconcile_platform_counters,
+    archive_game_sessions,
+    bulk_add_personal_banwords,
+    stream_word_set,
+    WORD_SET_EXPORT_COLUMNS,
 )
 from app.schemas import BanReason
 
@@ -65,25 +88,89 @@ async def admin_login(data: AdminLoginRequest):
 
 
 @router.get("/stats", response_model=AdminStatsResponse)
+@query_budget(3)  # без счётчиков: их SELECT, подсчёт по таблицам, онлайн
 async def get_stats(
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    response: Response,
     _: bool = Depends(verify_admin_token)
 ):
     """Получить статистику"""
-    stats = await get_admin_stats(db)
+    # Счётчики меняются почти с каждым запросом, поэтому версия — ещё и интервал кэша статистики
+    etag = resource_versions.etag(Resource.STATS, time_bucket(settings.admin_stats_cache_seconds))
+    if not_modified := conditional_get(request, response, etag):
+        return not_modified
+    
+    stats = await get_admin_stats()
     return AdminStatsResponse(**stats)
 
 
-@router.get("/players", response_model=List[PlayerResponse])
+@router.post("/profile", response_class=PlainTextResponse)
+async def profile_cpu(
+    seconds: float = Query(10, gt=0, le=120),
+    interval_ms: float = Query(10, ge=1, le=1000),
+    threads: bool = False,
+    _: bool = Depends(verify_admin_token)
+):
+    """
+    Снять CPU-профиль процесса за N секунд
+    
+    Возвращает folded stacks (flamegraph.pl, speedscope.app). По умолчанию
+    снимается стек event loop по CPU-таймеру всего процесса: CPU рабочих
+    потоков (asyncio.to_thread, bcrypt) попадёт на то, что в этот момент
+    делал event loop. threads=true — стеки всех потоков по стенным часам.
+    """
+    try:
+        profile = await profiler.profile(seconds, interval_ms / 1000, threads)
+    except ProfilerBusy:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Профилирование уже идёт"
+        )
+    return PlainTextResponse(
+        profile.folded(),
+        headers={"X-Profile-Samples": str(profile.samples)}
+    )
+
+
+@router.get("/players", response_model=List[Union[PlayerResponse, PlayerListItem]])
+@query_budget(1)
 async def get_players(
     skip: int = 0,
-    limit: int = 100,
-    db: AsyncSession = Depends(get_db),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    search: Optional[str] = None,
+    compact: bool = False,
+    db: AsyncSession = Depends(get_read_db),
     _: bool = Depends(verify_admin_token)
 ):
-    """Получить всех игроков"""
-    players = await get_all_players(db, skip, limit)
-    return [PlayerResponse.model_validate(p) for p in players]
+    """
+    Получить игроков по убыванию баланса.
+    
+    Следующая страница — запрос с cursor из заголовка X-Next-Cursor.
+    compact=true не отдаёт личные банворды.
+    """
+    position = None
+    if cursor:
+        position = decode_player_cursor(cursor)
+        if position is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Неверный курсор"
+            )
+    
+    rows = await get_all_players(db, skip, limit, position, search, compact)
+    
+    # Строки сразу в JSON: на больших страницах время уходило на модели по каждой записи
+    players = [row._asdict() for row in rows]
+    if not compact:
+        for player in players:
+            player["personal_banwords"] = player["personal_banwords"] or []
+    
+    headers = {}
+    if len(rows) == limit:
+        last = rows[-1]
+        headers["X-Next-Cursor"] = encode_player_cursor(last.balance, last.id)
+    return ORJSONResponse(players, headers=headers)
 
 
 @router.patch("/players/{player_id}/balance")
@@ -104,6 +191,7 @@ async def update_player_balance_admin(
 
 
 @router.post("/players/{player_id}/ban")
+@query_budget(4)
 async def ban_player_admin(
     player_id: int,
     reason: str = "lottery",
@@ -130,11 +218,17 @@ async def ban_player_admin(
 # === Weekly Banwords ===
 
 @router.get("/banwords/weekly", response_model=List[WeeklyBanwordResponse])
+@query_budget(1)
 async def get_weekly_banwords(
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     _: bool = Depends(verify_admin_token)
 ):
     """Получить банворды недели"""
+    if not_modified := conditional_get(request, response, resource_versions.etag(Resource.WEEKLY_BANWORDS)):
+        return not_modified
+    
     banwords = await get_active_weekly_banwords(db)
     return [WeeklyBanwordResponse.model_validate(b) for b in banwords]
 
@@ -150,6 +244,22 @@ async def add_weekly_banword(
     return WeeklyBanwordResponse.model_validate(banword)
 
 
+@router.post("/banwords/weekly/lottery", response_model=WeeklyBanwordResponse)
+@query_budget(6)  # границы пула, UPDATE слова (+ запасной), отключение старых, INSERT, refresh
+async def roll_weekly_banword(
+    db: AsyncSession = Depends(get_db),
+    _: bool = Depends(verify_admin_token)
+):
+    """Разыграть новое слово недели из пула лотереи (старые слова недели отключаются)"""
+    banword = await roll_weekly_lottery(db)
+    if not banword:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Пул слов пуст"
+        )
+    return WeeklyBanwordResponse.model_validate(banword)
+
+
 @router.delete("/banwords/weekly/{banword_id}")
 async def remove_weekly_banword(
     banword_id: int,
@@ -169,11 +279,17 @@ async def remove_weekly_banword(
 # === Lottery Word Pool ===
 
 @router.get("/lottery-words", response_model=List[LotteryWordResponse])
+@query_budget(1)
 async def get_lottery_words(
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     _: bool = Depends(verify_admin_token)
 ):
     """Получить все слова из пула лотереи"""
+    if not_modified := conditional_get(request, response, resource_versions.etag(Resource.LOTTERY_WORDS)):
+        return not_modified
+    
     words = await get_lottery_word_pool(db)
     return [LotteryWordResponse.model_validate(word) for word in words]
 
@@ -234,16 +350,23 @@ async def get_random_word(
 # === Global Banwords ===
 
 @router.get("/banwords", response_model=List[GlobalBanwordResponse])
+@query_budget(1)
 async def get_global_banwords(
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     _: bool = Depends(verify_admin_token)
 ):
     """Получить глобальные банворды"""
+    if not_modified := conditional_get(request, response, resource_versions.etag(Resource.GLOBAL_BANWORDS)):
+        return not_modified
+    
     banwords = await get_all_global_banwords(db)
     return [GlobalBanwordResponse.model_validate(b) for b in banwords]
 
 
 @router.post("/banwords", response_model=GlobalBanwordResponse)
+@query_budget(3)
 async def add_global_banword(
     data: GlobalBanwordCreate,
     db: AsyncSession = Depends(get_db),
@@ -254,6 +377,17 @@ async def add_global_banword(
     return GlobalBanwordResponse.model_validate(banword)
 
 
+@router.post("/banwords/bulk")
+async def bulk_create_global_banwords(
+    words: List[str],
+    db: AsyncSession = Depends(get_db),
+    _: bool = Depends(verify_admin_token)
+):
+    """Массово добавить глобальные банворды (например, весь banned_words.txt)"""
+    added_count = await bulk_add_global_banwords(db, words)
+    return {"added": added_count, "total_requested": len(words)}
+
+
 @router.delete("/banwords/{banword_id}")
 async def remove_global_banword_endpoint(
     banword_id: int,
@@ -286,9 +420,7 @@ async def unban_player_admin(
             detail="Игрок не найден"
         )
     
-    player.is_banned = False
-    player.ban_expires_at = None
-    await db.commit()
+    await unban_player(db, player)
     return {"success": True}
 
 
@@ -306,9 +438,7 @@ async def reset_player_balance(
             detail="Игрок не найден"
         )
     
-    player.balance = settings.starting_balance
-    player.current_buyout_price = settings.base_buyout_price
-    await db.commit()
+    await reset_player_to_starting_balance(db, player)
     return {"success": True, "new_balance": player.balance}
 
 
@@ -318,24 +448,162 @@ async def check_expired_bans(
     _: bool = Depends(verify_admin_token)
 ):
     """Проверить и снять истёкшие баны"""
-    now = datetime.utcnow()
-    
-    # Находим всех забаненных с истёкшим сроком
-    result = await db.execute(
-        select(Player).where(
-            Player.is_banned == True,
-            Player.ban_expires_at <= now
+    count = await unban_expired_players(db)
+    return {"success": True, "unbanned": count}
+
+
+@router.post("/counters/reconcile")
+async def reconcile_counters(
+    db: AsyncSession = Depends(get_db),
+    _: bool = Depends(verify_admin_token)
+):
+    """Пересчитать счётчики статистики по таблицам"""
+    drift = await reconcile_platform_counters(db)
+    return {"success": True, "drift": drift}
+
+
+@router.post("/game-sessions/archive")
+async def archive_old_game_sessions(
+    retention_days: Optional[int] = Query(None, ge=1),
+    db: AsyncSession = Depends(get_db),
+    _: bool = Depends(verify_admin_token)
+):
+    """Удалить сырые игровые сессии старше срока хранения (итоги по дням остаются)"""
+    deleted = await archive_game_sessions(db, retention_days)
+    return {"success": True, "deleted": deleted}
+
+
+# === Word Lists Import/Export ===
+
+WORD_SET_IMPORTERS = {
+    WordSet.GLOBAL: bulk_add_global_banwords,
+    WordSet.LOTTERY: bulk_add_lottery_words,
+    WordSet.PERSONAL: bulk_add_personal_banwords,
+}
+
+EXPORT_FLUSH_BYTES = 64 * 1024
+
+
+def _check_word_set(word_set: str):
+    if word_set not in WordSet.ALL:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Неизвестный набор слов"
         )
-    )
-    expired_players = result.scalars().all()
+
+
+@router.get("/wordlists/imports", response_model=List[WordListImportResponse])
+async def list_wordlist_imports(_: bool = Depends(verify_admin_token)):
+    """Последние загрузки списков слов (в памяти процесса)"""
+    return [progress.as_dict() for progress in import_registry.all()]
+
+
+@router.get("/wordlists/imports/{import_id}", response_model=WordListImportResponse)
+async def get_wordlist_import(import_id: str, _: bool = Depends(verify_admin_token)):
+    """Прогресс загрузки списка слов"""
+    progress = import_registry.get(import_id)
+    if not progress:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Загрузка не найдена"
+        )
+    return progress.as_dict()
+
+
+@router.post("/wordlists/{word_set}/import", response_model=WordListImportResponse)
+async def import_word_list(
+    word_set: str,
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(text|csv)$"),
+    import_id: Optional[str] = Query(None, pattern=r"^[\w-]{1,64}$"),
+    db: AsyncSession = Depends(get_db),
+    _: bool = Depends(verify_admin_token)
+):
+    """
+    Загрузить список слов потоком, пачками по wordlist_import_chunk строк
     
-    count = 0
-    for player in expired_players:
-        player.is_banned = False
-        player.ban_expires_at = None
-        count += 1
+    Тело — text (слово на строку) или csv; для personal — telegram_id,word.
+    Каждая пачка коммитится отдельно; прогресс — GET /admin/wordlists/imports/{id}.
+    """
+    _check_word_set(word_set)
+    if word_set not in WordSet.IMPORTABLE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Слово недели выбирает лотерея, списком его не загружают"
+        )
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "text"
     
-    await db.commit()
+    importer = WORD_SET_IMPORTERS[word_set]
+    try:
+        progress = import_registry.start(word_set, format, import_id)
+    except ImportInProgress as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    try:
+        async for records in iter_record_batches(
+            request.stream(), format, settings.wordlist_import_chunk, progress
+        ):
+            rows = parse_records(records, format, word_set, progress)
+            progress.added += await importer(db, rows)
+            progress.chunks += 1
+    except ImportFormatError as e:
+        progress.finish(str(e))
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{e} (загружено пачек: {progress.chunks}, добавлено: {progress.added})"
+        )
+    except Exception as e:
+        progress.finish(repr(e))
+        raise
     
-    return {"success": True, "unbanned": count}
+    progress.finish()
+    print(f"[wordlists] Импорт {progress.id} ({word_set}, {format}): "
+          f"{progress.words} слов, добавлено {progress.added}")
+    return progress.as_dict()
 
+
+@router.get("/wordlists/{word_set}/export")
+async def export_word_list(
+    word_set: str,
+    format: str = Query("text", pattern="^(text|csv)$"),
+    _: bool = Depends(verify_admin_token)
+):
+    """
+    Выгрузить набор слов потоком (text или csv) — для бэкапа и переноса между окружениями
+    
+    В text слова с переводом строки не помещаются в формат и пропускаются —
+    для полной выгрузки нужен csv.
+    """
+    _check_word_set(word_set)
+    columns = WORD_SET_EXPORT_COLUMNS[word_set]
+    
+    async def body():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        if format == "csv":
+            writer.writerow(columns)
+        # Своя сессия: зависимости с yield закрываются до того, как ответ начнёт стримиться
+        async with async_read_session_maker() as db:
+            async for row in stream_word_set(db, word_set):
+                if format == "csv":
+                    writer.writerow(value.isoformat() if isinstance(value, datetime) else value for value in row)
+                else:
+                    word = row[1] if word_set == WordSet.PERSONAL else row[0]
+                    if "\n" not in word and "\r" not in word:
+                        buffer.write(f"{row[0]} {word}\n" if word_set == WordSet.PERSONAL else f"{word}\n")
+                if buffer.tell() >= EXPORT_FLUSH_BYTES:
+                    yield buffer.getvalue().encode()
+                    buffer.seek(0)
+                    buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+    
+    extension = "csv" if format == "csv" else "txt"
+    return StreamingResponse(
+        body(),
+        media_type="text/csv; charset=utf-8" if format == "csv" else "text/plain; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{word_set}_words.{extension}"'}
+    )
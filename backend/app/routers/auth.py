@@ -1,13 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
+from urllib.parse import parse_qsl
+import hashlib
+import json
 
 from app.database import get_db
+from app.metrics import query_budget
 from app.auth import (
     verify_telegram_auth, 
+    verify_webapp_init_data,
+    init_data_cache_ttl,
     create_access_token, 
     get_current_player
 )
+from app.cache import init_data_cache, player_cache
+from app.presence import presence_tracker
 from app.config import settings
 from app.schemas import (
     TelegramAuthData, 
@@ -15,7 +23,7 @@ from app.schemas import (
     PlayerCreate, 
     PlayerResponse
 )
-from app.crud import get_or_create_player
+from app.crud import get_or_create_player, get_player_by_telegram_id
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -29,12 +37,12 @@ async def auth_telegram(
     Авторизация через Telegram WebApp
     """
     # В продакшене проверяем подпись
-    # if settings.telegram_bot_token:
-    #     if not verify_telegram_auth(auth_data.model_dump(), settings.telegram_bot_token):
-    #         raise HTTPException(
-    #             status_code=status.HTTP_401_UNAUTHORIZED,
-    #             detail="Неверная подпись Telegram"
-    #         )
+    if settings.telegram_bot_token:
+        if not verify_telegram_auth(auth_data.model_dump(), settings.telegram_bot_token):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Неверная подпись Telegram"
+            )
     
     # Создаём или получаем игрока
     player_data = PlayerCreate(
@@ -57,17 +65,74 @@ async def auth_telegram(
     )
 
 
+def _webapp_auth_response(player, access_token: str, is_new: bool) -> dict:
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "player": PlayerResponse.model_validate(player),
+        "is_new": is_new
+    }
+
+
 @router.post("/telegram/webapp")
+@query_budget(3)  # новый игрок: SELECT, INSERT, счётчики
 async def auth_telegram_webapp(
     init_data: dict,
     db: AsyncSession = Depends(get_db)
 ):
     """
     Авторизация через Telegram WebApp initData
-    Принимает распарсенные данные из window.Telegram.WebApp.initDataUnsafe
+    
+    Принимает {"init_data": window.Telegram.WebApp.initData} и проверяет подпись.
+    Без TELEGRAM_BOT_TOKEN (локальная разработка) подпись не проверяется
+    и принимаются также распарсенные данные initDataUnsafe.
     """
-    user = init_data.get("user", {})
+    raw_init_data = init_data.get("init_data")
+    cache_key = None
+    
+    if isinstance(raw_init_data, str) and raw_init_data:
+        cache_key = hashlib.sha256(raw_init_data.encode()).digest()
+        
+        # Эта initData уже проверялась — не пересчитываем подпись и не пишем в БД
+        cached = init_data_cache.get(cache_key)
+        if cached is not None:
+            telegram_id, access_token = cached
+            presence_tracker.touch(telegram_id)
+            player = player_cache.get(telegram_id) or await get_player_by_telegram_id(db, telegram_id)
+            if player is not None:
+                return _webapp_auth_response(player, access_token, False)
+        
+        if settings.telegram_bot_token:
+            fields = verify_webapp_init_data(raw_init_data, settings.telegram_bot_token)
+            if fields is None:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Неверная или устаревшая подпись Telegram"
+                )
+        else:
+            fields = dict(parse_qsl(raw_init_data))
+            try:
+                fields["user"] = json.loads(fields.get("user") or "{}")
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Неверный JSON в user"
+                )
+        user = fields.get("user") or {}
+    elif settings.telegram_bot_token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Нужна подписанная initData"
+        )
+    else:
+        fields = init_data
+        user = init_data.get("user", {})
     
+    if not isinstance(user, dict):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="user в initData должен быть объектом"
+        )
     if not user.get("id"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -87,12 +152,12 @@ async def auth_telegram_webapp(
         data={"telegram_id": player.telegram_id, "player_id": player.id}
     )
     
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "player": PlayerResponse.model_validate(player),
-        "is_new": is_new
-    }
+    if cache_key is not None and fields.get("auth_date"):
+        ttl = init_data_cache_ttl(fields["auth_date"])
+        if ttl > 0:
+            init_data_cache.set(cache_key, (player.telegram_id, access_token), ttl=ttl)
+    
+    return _webapp_auth_response(player, access_token, is_new)
 
 
 @router.get("/me", response_model=PlayerResponse)
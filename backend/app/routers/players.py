@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
-from typing import List
+from typing import List, Optional
 
-from app.database import get_db
+from app.database import get_db, get_read_db
+from app.metrics import query_budget
+from app.responses import ORJSONResponse
+from app.etag import resource_versions, Resource, conditional_get, etag_headers
 from app.auth import get_current_player
 from app.models import Player
 from app.schemas import (
@@ -15,46 +17,51 @@ from app.schemas import (
     GameSessionCreate,
     GameSessionResponse,
     LeaderboardEntry,
+    PlayerRankResponse,
+    GameTypeStats,
+    PlayerGameStatsResponse,
 )
 from app.crud import (
-    update_player_balance,
     update_player_personal_banwords,
     get_player_ban_history,
     buyout_ban,
     create_game_session,
+    get_player_rank,
+    get_top_players,
+    get_player_by_telegram_id,
+    get_player_game_stats,
+    LEADERBOARD_MAX_LIMIT,
 )
 
 router = APIRouter(prefix="/players", tags=["players"])
 
 
 @router.get("/leaderboard", response_model=List[LeaderboardEntry])
+@query_budget(1)
 async def get_leaderboard(
-    limit: int = Query(20, ge=1, le=100),
+    request: Request,
+    response: Response,
+    limit: int = Query(20, ge=1, le=LEADERBOARD_MAX_LIMIT),
     db: AsyncSession = Depends(get_db)
 ):
     """Получить лидерборд игроков по балансу"""
-    result = await db.execute(
-        select(Player)
-        .where(Player.is_banned == False)
-        .order_by(desc(Player.balance))
-        .limit(limit)
-    )
-    players = result.scalars().all()
+    etag = resource_versions.etag(Resource.LEADERBOARD, limit)
+    if not_modified := conditional_get(request, response, etag):
+        return not_modified
     
-    return [
-        LeaderboardEntry(
-            rank=idx + 1,
-            telegram_id=p.telegram_id,
-            username=p.username,
-            first_name=p.first_name,
-            balance=p.balance,
-            total_wins=p.total_wins or 0
-        )
-        for idx, p in enumerate(players)
-    ]
+    rows = await get_top_players(db, limit)
+    # Строки сразу в JSON, без ORM-объектов и моделей на каждую запись
+    return ORJSONResponse(
+        [
+            {"rank": idx + 1, **row._asdict(), "total_wins": row.total_wins or 0}
+            for idx, row in enumerate(rows)
+        ],
+        headers=etag_headers(etag)
+    )
 
 
 @router.get("/me", response_model=PlayerResponse)
+@query_budget(1)
 async def get_current_player_info(
     current_player: Player = Depends(get_current_player)
 ):
@@ -62,6 +69,43 @@ async def get_current_player_info(
     return PlayerResponse.model_validate(current_player)
 
 
+@router.get("/me/rank", response_model=PlayerRankResponse)
+@query_budget(3)
+async def get_my_rank(
+    neighbours: int = Query(2, ge=0, le=10),
+    current_player: Player = Depends(get_current_player),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Получить место в рейтинге по балансу и соседей
+    
+    Рейтинг в памяти обновляется сразу после коммита, поэтому соседей читаем
+    с primary — реплика сразу после сохранения игры может отставать от него.
+    """
+    rank_data = await get_player_rank(db, current_player, neighbours)
+    
+    def entries(items):
+        return [
+            LeaderboardEntry(
+                rank=rank,
+                telegram_id=p.telegram_id,
+                username=p.username,
+                first_name=p.first_name,
+                balance=p.balance,
+                total_wins=p.games_won or 0
+            )
+            for rank, p in items
+        ]
+    
+    return PlayerRankResponse(
+        rank=rank_data["rank"],
+        total_players=rank_data["total_players"],
+        balance=rank_data["balance"],
+        above=entries(rank_data["above"]),
+        below=entries(rank_data["below"]),
+    )
+
+
 @router.patch("/me", response_model=PlayerResponse)
 async def update_current_player(
     update_data: PlayerUpdate,
@@ -82,9 +126,10 @@ async def update_current_player(
 
 
 @router.get("/me/bans", response_model=List[BanHistoryResponse])
+@query_budget(2)
 async def get_my_ban_history(
     current_player: Player = Depends(get_current_player),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Получить историю банов"""
     bans = await get_player_ban_history(db, current_player.id)
@@ -92,6 +137,7 @@ async def get_my_ban_history(
 
 
 @router.post("/me/buyout", response_model=BuyoutResponse)
+@query_budget(6)
 async def buyout_current_ban(
     current_player: Player = Depends(get_current_player),
     db: AsyncSession = Depends(get_db)
@@ -105,8 +151,7 @@ async def buyout_current_ban(
             detail=message
         )
     
-    await db.refresh(current_player)
-    
+    # buyout_ban перечитал и обновил этот же объект игрока в сессии
     return BuyoutResponse(
         success=True,
         message=message,
@@ -116,29 +161,50 @@ async def buyout_current_ban(
 
 
 @router.post("/me/games", response_model=GameSessionResponse)
+@query_budget(6)
 async def save_game_session(
     session_data: GameSessionCreate,
     current_player: Player = Depends(get_current_player),
     db: AsyncSession = Depends(get_db)
 ):
-    """Сохранить результат игры"""
-    # Обновляем баланс если есть выигрыш/проигрыш
-    balance_change = session_data.win_amount - session_data.bet_amount
-    if balance_change != 0:
-        await update_player_balance(db, current_player.id, balance_change)
-    
+    """Сохранить результат игры (баланс меняется на win_amount - bet_amount)"""
     session = await create_game_session(db, current_player.id, session_data)
     return GameSessionResponse.model_validate(session)
 
 
+async def _game_stats_response(db: AsyncSession, player: Player, days: Optional[int]) -> PlayerGameStatsResponse:
+    games = [GameTypeStats(**row) for row in await get_player_game_stats(db, player.id, days)]
+    return PlayerGameStatsResponse(
+        telegram_id=player.telegram_id,
+        days=days,
+        total_games=sum(g.plays for g in games),
+        total_wins=sum(g.wins for g in games),
+        net_profit=sum(g.net_profit for g in games),
+        best_score=max((g.best_score for g in games), default=0),
+        games=games,
+    )
+
+
+@router.get("/me/stats", response_model=PlayerGameStatsResponse)
+@query_budget(2)
+async def get_my_game_stats(
+    days: Optional[int] = Query(None, ge=1, le=365),
+    current_player: Player = Depends(get_current_player),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Моя статистика по играм (за всё время или за последние N дней)"""
+    return await _game_stats_response(db, current_player, days)
+
+
 @router.post("/me/banwords", response_model=PlayerResponse)
+@query_budget(5)
 async def add_personal_banword(
     word: str,
     current_player: Player = Depends(get_current_player),
     db: AsyncSession = Depends(get_db)
 ):
     """Добавить личный банворд"""
-    banwords = current_player.personal_banwords or []
+    banwords = list(current_player.personal_banwords or [])
     word_lower = word.lower().strip()
     
     if word_lower not in banwords:
@@ -150,13 +216,14 @@ async def add_personal_banword(
 
 
 @router.delete("/me/banwords/{word}", response_model=PlayerResponse)
+@query_budget(5)
 async def remove_personal_banword(
     word: str,
     current_player: Player = Depends(get_current_player),
     db: AsyncSession = Depends(get_db)
 ):
     """Удалить личный банворд"""
-    banwords = current_player.personal_banwords or []
+    banwords = list(current_player.personal_banwords or [])
     word_lower = word.lower().strip()
     
     if word_lower in banwords:
@@ -165,3 +232,20 @@ async def remove_personal_banword(
     
     await db.refresh(current_player)
     return PlayerResponse.model_validate(current_player)
+
+
+@router.get("/{telegram_id}/stats", response_model=PlayerGameStatsResponse)
+@query_budget(2)
+async def get_player_game_stats_by_telegram_id(
+    telegram_id: int,
+    days: Optional[int] = Query(None, ge=1, le=365),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Статистика игрока по играм (за всё время или за последние N дней)"""
+    player = await get_player_by_telegram_id(db, telegram_id)
+    if not player:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Игрок не найден"
+        )
+    return await _game_stats_response(db, player, days)
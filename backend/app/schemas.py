@@ -16,7 +16,8 @@ class PlayerCreate(PlayerBase):
     pass
 
 
-class PlayerResponse(PlayerBase):
+class PlayerListItem(PlayerBase):
+    """Игрок в списке админки (без тяжёлых полей)"""
     id: int
     balance: int
     ban_count: int
@@ -25,7 +26,6 @@ class PlayerResponse(PlayerBase):
     ban_expires_at: Optional[datetime] = None
     last_ban_reason: Optional[str] = None
     last_ban_word: Optional[str] = None
-    personal_banwords: List[str] = []
     games_played: int
     games_won: int
     created_at: datetime
@@ -35,6 +35,10 @@ class PlayerResponse(PlayerBase):
         from_attributes = True
 
 
+class PlayerResponse(PlayerListItem):
+    personal_banwords: List[str] = []
+
+
 class PlayerPublic(BaseModel):
     """Публичная информация об игроке"""
     id: int
@@ -141,6 +145,28 @@ class GameSessionCreate(BaseModel):
     is_win: bool = False
 
 
+class GameTypeStats(BaseModel):
+    """Статистика по одному типу игры"""
+    game_type: str
+    plays: int = 0
+    wins: int = 0
+    net_profit: int = 0
+    best_score: int = 0
+    current_streak: Optional[int] = None  # только за всё время
+    best_streak: Optional[int] = None
+
+
+class PlayerGameStatsResponse(BaseModel):
+    """Игровая статистика игрока"""
+    telegram_id: int
+    days: Optional[int] = None  # None — за всё время
+    total_games: int = 0
+    total_wins: int = 0
+    net_profit: int = 0
+    best_score: int = 0
+    games: List[GameTypeStats] = []
+
+
 class GameSessionResponse(BaseModel):
     id: int
     game_type: str
@@ -226,9 +252,26 @@ class AdminStatsResponse(BaseModel):
     weekly_banwords: int = 0
 
 
-class LeaderboardEntry(BaseModel):
+class PlayerRankResponse(BaseModel):
+    """Место игрока в рейтинге и ближайшие соседи"""
     rank: int
-    player: PlayerPublic
-    
-    class Config:
-        from_attributes = True
+    total_players: int
+    balance: int
+    above: List[LeaderboardEntry] = []
+    below: List[LeaderboardEntry] = []
+
+
+class WordListImportResponse(BaseModel):
+    """Прогресс и итог загрузки списка слов"""
+    id: str
+    word_set: str
+    format: str
+    status: str  # running, done, failed
+    bytes: int
+    lines: int
+    words: int
+    added: int
+    chunks: int
+    error: Optional[str] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
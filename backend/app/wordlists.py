@@ -0,0 +1,184 @@
+import codecs
+import csv
+import secrets
+from collections import OrderedDict
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+
+
+class WordSet:
+    """Наборы слов, которые можно выгрузить (и загрузить) списком"""
+    GLOBAL = "global"
+    WEEKLY = "weekly"
+    LOTTERY = "lottery"
+    PERSONAL = "personal"
+
+    ALL = (GLOBAL, WEEKLY, LOTTERY, PERSONAL)
+    # Слово недели выбирает лотерея — списком его не загружают
+    IMPORTABLE = (GLOBAL, LOTTERY, PERSONAL)
+
+
+class ImportFormatError(ValueError):
+    """Строку загружаемого списка не удалось разобрать"""
+
+
+class ImportInProgress(RuntimeError):
+    """Загрузка с таким id ещё идёт"""
+
+
+class ImportProgress:
+    """Состояние одной загрузки списка"""
+
+    def __init__(self, import_id: str, word_set: str, fmt: str):
+        self.id = import_id
+        self.word_set = word_set
+        self.format = fmt
+        self.status = "running"  # running, done, failed
+        self.bytes = 0
+        self.lines = 0
+        self.words = 0  # разобранных слов (до дедупликации)
+        self.added = 0  # стали активными
+        self.chunks = 0
+        self.error: Optional[str] = None
+        self.started_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+
+    def finish(self, error: Optional[str] = None):
+        self.status = "failed" if error else "done"
+        self.error = error
+        self.finished_at = datetime.utcnow()
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "word_set": self.word_set,
+            "format": self.format,
+            "status": self.status,
+            "bytes": self.bytes,
+            "lines": self.lines,
+            "words": self.words,
+            "added": self.added,
+            "chunks": self.chunks,
+            "error": self.error,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class ImportRegistry:
+    """Последние загрузки списков в памяти процесса (для опроса прогресса)"""
+
+    def __init__(self, keep: int = 50):
+        self.keep = keep
+        self._imports: "OrderedDict[str, ImportProgress]" = OrderedDict()
+
+    def start(self, word_set: str, fmt: str, import_id: Optional[str] = None) -> ImportProgress:
+        running = self._imports.get(import_id) if import_id else None
+        if running is not None and running.status == "running":
+            raise ImportInProgress(f"Загрузка {import_id} ещё идёт")
+        progress = ImportProgress(import_id or secrets.token_hex(8), word_set, fmt)
+        self._imports[progress.id] = progress
+        self._imports.move_to_end(progress.id)
+        while len(self._imports) > self.keep:
+            self._imports.popitem(last=False)
+        return progress
+
+    def get(self, import_id: str) -> Optional[ImportProgress]:
+        return self._imports.get(import_id)
+
+    def all(self) -> List[ImportProgress]:
+        return list(reversed(self._imports.values()))
+
+
+import_registry = ImportRegistry()
+
+
+async def iter_record_batches(
+    stream: AsyncIterator[bytes],
+    fmt: str,
+    batch_size: int,
+    progress: ImportProgress
+) -> AsyncIterator[List[Tuple[int, str]]]:
+    """
+    Записи тела запроса пачками по batch_size, не держа всё тело в памяти.
+
+    Запись — (номер первой строки, текст). В csv запись с переводом строки
+    внутри кавычек занимает несколько строк и в пачку попадает целиком.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    tail = ""
+    batch: List[Tuple[int, str]] = []
+    pending: List[str] = []  # строки csv-записи с незакрытыми кавычками
+    quote_open = False
+
+    def push(line: str):
+        nonlocal quote_open
+        progress.lines += 1
+        line = line.rstrip("\r")
+        if fmt != "csv":
+            batch.append((progress.lines, line))
+            return
+        pending.append(line)
+        # Кавычки внутри поля удваиваются, поэтому нечётное число — поле не закрыто
+        quote_open ^= line.count('"') % 2 == 1
+        if not quote_open:
+            batch.append((progress.lines - len(pending) + 1, "\n".join(pending)))
+            pending.clear()
+
+    async for chunk in stream:
+        progress.bytes += len(chunk)
+        lines = (tail + decoder.decode(chunk)).split("\n")
+        tail = lines.pop()  # последняя строка может продолжиться в следующем куске
+        for line in lines:
+            push(line)
+        while len(batch) >= batch_size:
+            yield batch[:batch_size]
+            batch = batch[batch_size:]
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        push(tail)
+    if pending:
+        # Кавычки так и не закрылись — csv.reader сообщит об ошибке
+        batch.append((progress.lines - len(pending) + 1, "\n".join(pending)))
+    if batch:
+        yield batch
+
+
+def parse_records(records: List[Tuple[int, str]], fmt: str, word_set: str, progress: ImportProgress) -> list:
+    """
+    Разобрать пачку записей.
+
+    text: слово на строку (# — комментарий). csv: слово в первой колонке,
+    для personal — telegram_id,word. Строка-заголовок пропускается.
+    Возвращает слова или пары (telegram_id, слово) для personal.
+    """
+    rows = []
+    for line_no, text in records:
+        if fmt == "csv":
+            try:
+                record = next(csv.reader([text], strict=True), [])
+            except csv.Error as e:
+                raise ImportFormatError(f"Строка {line_no}: {e}")
+        else:
+            record = [text.strip()]
+
+        if not record or not record[0].strip() or record[0].lstrip().startswith("#"):
+            continue
+        if word_set == WordSet.PERSONAL:
+            if len(record) < 2:
+                record = record[0].split(None, 1)
+            if len(record) < 2:
+                raise ImportFormatError(f"Строка {line_no}: нужно telegram_id,word")
+            telegram_id, word = record[0].strip(), record[1]
+            if not telegram_id.lstrip("-").isdigit():
+                if line_no == 1:
+                    continue  # заголовок
+                raise ImportFormatError(f"Строка {line_no}: неверный telegram_id {telegram_id!r}")
+            rows.append((int(telegram_id), word))
+        else:
+            word = record[0]
+            if fmt == "csv" and line_no == 1 and word.strip().lower() == "word":
+                continue  # заголовок
+            rows.append(word)
+    progress.words += len(rows)
+    return rows
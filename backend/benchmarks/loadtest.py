@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест бэкенда без сети
+
+Поднимает приложение в процессе (httpx + ASGITransport) на локальной базе,
+создаёт N игроков и гоняет смесь сценариев (авторизация, сохранение игры,
+лидерборд, бан + выкуп, админская статистика) с заданной конкурентностью.
+Считает пропускную способность, перцентили задержки и число SQL-запросов
+(из заголовка Server-Timing) по каждому запросу. Генератор случайных чисел
+и число запросов фиксированы, поэтому прогоны сравнимы между собой.
+
+    cd backend
+    python benchmarks/loadtest.py --players 1000 --requests 5000 --concurrency 20
+    python benchmarks/loadtest.py --mix game=80,leaderboard=20 --save-baseline loadtest_baseline.json
+    python benchmarks/loadtest.py --baseline loadtest_baseline.json --max-regression 0.2
+
+По умолчанию база — свежий SQLite-файл. Для Postgres: --database-url на пустую базу.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import platform
+import random
+import re
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+BOT_TOKEN = "123456:loadtest"
+ADMIN_PASSWORD = "loadtest"
+TELEGRAM_ID_BASE = 10_000_000
+GAME_TYPES = ("horse_racing", "slots", "block_blast", "rover_smash")
+
+MIXES = {
+    "default": "game=60,leaderboard=15,auth=10,buyout=5,admin_stats=10",
+    "read-heavy": "leaderboard=50,admin_stats=20,auth=20,game=10",
+    "write-heavy": "game=80,buyout=15,auth=5",
+}
+
+_SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+_SERVER_TIMING_DB = re.compile(r"db;dur=([\d.]+)")
+
+
+# ==================== ДАННЫЕ ====================
+
+def sign_init_data(user: dict, auth_date: int) -> str:
+    """initData, подписанная так же, как её подписывает Telegram"""
+    fields = {
+        "auth_date": str(auth_date),
+        "query_id": f"lt{user['id']}{auth_date}",
+        "user": json.dumps(user, separators=(",", ":")),
+    }
+    data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(fields.items()))
+    secret_key = hmac.new(b"WebAppData", BOT_TOKEN.encode(), hashlib.sha256).digest()
+    fields["hash"] = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+    return urlencode(fields)
+
+
+async def seed_players(count: int, seed: int) -> list:
+    """Создать игроков; возвращает [(id, telegram_id)]"""
+    from app.database import async_session_maker
+    from app.models import Player
+
+    rng = random.Random(f"{seed}-players")
+    players = []
+    async with async_session_maker() as db:
+        for start in range(0, count, 1000):
+            batch = [
+                Player(
+                    telegram_id=TELEGRAM_ID_BASE + i,
+                    username=f"player{i}",
+                    first_name=f"Player {i}",
+                    balance=rng.randint(500, 50_000),
+                    personal_banwords=[],
+                )
+                for i in range(start, min(count, start + 1000))
+            ]
+            db.add_all(batch)
+            await db.commit()
+            players.extend((p.id, p.telegram_id) for p in batch)
+    return players
+
+
+# ==================== СЦЕНАРИИ ====================
+
+class LoadTest:
+    def __init__(self, client, players: list, seed: int):
+        from app.auth import create_access_token
+
+        self.client = client
+        self.players = players
+        self.samples = {}  # имя запроса -> [(секунды, статус, SQL-запросов, мс в SQL)]
+        self.tokens = {
+            telegram_id: create_access_token({"telegram_id": telegram_id, "player_id": player_id})
+            for player_id, telegram_id in players
+        }
+        self.init_data = {}  # telegram_id -> последняя initData (повторный вход попадает в кэш)
+        self.auth_date = int(time.time())
+        self.seed = seed
+
+    async def request(self, name: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        response = await self.client.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - started
+
+        server_timing = response.headers.get("server-timing", "")
+        queries = _SERVER_TIMING_QUERIES.search(server_timing)
+        db_ms = _SERVER_TIMING_DB.search(server_timing)
+        self.samples.setdefault(name, []).append((
+            elapsed,
+            response.status_code,
+            int(queries.group(1)) if queries else None,
+            float(db_ms.group(1)) if db_ms else None,
+        ))
+        return response
+
+    def _player_headers(self, telegram_id: int) -> dict:
+        return {"Authorization": f"Bearer {self.tokens[telegram_id]}"}
+
+    async def scenario_auth(self, rng: random.Random):
+        player_id, telegram_id = rng.choice(self.players)
+        init_data = self.init_data.get(telegram_id)
+        if init_data is None or rng.random() < 0.5:
+            # Новая initData: проверка подписи и запись в БД
+            self.auth_date += 1
+            user = {"id": telegram_id, "first_name": f"Player {telegram_id}", "username": f"p{telegram_id}"}
+            init_data = self.init_data[telegram_id] = sign_init_data(user, self.auth_date)
+        await self.request("auth", "POST", "/auth/telegram/webapp", json={"init_data": init_data})
+
+    async def scenario_game(self, rng: random.Random):
+        player_id, telegram_id = rng.choice(self.players)
+        bet = rng.randint(10, 100)
+        is_win = rng.random() < 0.45
+        await self.request(
+            "game", "POST", "/players/me/games",
+            headers=self._player_headers(telegram_id),
+            json={
+                "game_type": rng.choice(GAME_TYPES),
+                "score": rng.randint(0, 5000),
+                "bet_amount": bet,
+                "win_amount": bet * 2 if is_win else 0,
+                "is_win": is_win,
+            }
+        )
+
+    async def scenario_leaderboard(self, rng: random.Random):
+        await self.request("leaderboard", "GET", "/players/leaderboard", params={"limit": 20})
+
+    async def scenario_buyout(self, rng: random.Random):
+        player_id, telegram_id = rng.choice(self.players)
+        await self.request(
+            "ban", "POST", f"/admin/players/{player_id}/ban",
+            params={"reason": rng.choice(("lottery", "weekly_word", "personal_word"))},
+            headers={"X-Admin-Password": ADMIN_PASSWORD}
+        )
+        await self.request("buyout", "POST", "/players/me/buyout", headers=self._player_headers(telegram_id))
+
+    async def scenario_admin_stats(self, rng: random.Random):
+        await self.request("admin_stats", "GET", "/admin/stats", headers={"X-Admin-Password": ADMIN_PASSWORD})
+
+    async def run(self, mix: dict, total: int, concurrency: int):
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        scenarios = [getattr(self, f"scenario_{name}") for name in names]
+        remaining = total
+
+        async def worker(worker_id: int):
+            nonlocal remaining
+            rng = random.Random(f"{self.seed}-worker-{worker_id}")
+            while remaining > 0:
+                remaining -= 1
+                scenario = rng.choices(scenarios, weights)[0]
+                await scenario(rng)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        return time.perf_counter() - started
+
+
+# ==================== ОТЧЁТ ====================
+
+def percentile(sorted_values: list, q: float) -> float:
+    idx = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return sorted_values[idx]
+
+
+def summarize(samples: dict, elapsed: float) -> dict:
+    report = {}
+    for name, rows in sorted(samples.items()):
+        latencies = sorted(row[0] for row in rows)
+        statuses = {}
+        for row in rows:
+            statuses[str(row[1])] = statuses.get(str(row[1]), 0) + 1
+        queries = [row[2] for row in rows if row[2] is not None]
+        db_ms = [row[3] for row in rows if row[3] is not None]
+        report[name] = {
+            "count": len(rows),
+            "rps": len(rows) / elapsed,
+            "statuses": statuses,
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "max_ms": latencies[-1] * 1000,
+            "avg_queries": sum(queries) / len(queries) if queries else None,
+            "max_queries": max(queries) if queries else None,
+            "avg_db_ms": sum(db_ms) / len(db_ms) if db_ms else None,
+        }
+    return report
+
+
+def print_report(report: dict, total: dict, baseline: dict):
+    header = (
+        f"{'request':<12} {'count':>6} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+        f"{'max ms':>8} {'SQL avg':>7} {'SQL max':>7} {'db ms':>6}  statuses"
+    )
+    if baseline:
+        header += "  Δ p95 / Δ SQL"
+    print(header)
+    print("-" * len(header))
+    for name, row in report.items():
+        line = (
+            f"{name:<12} {row['count']:>6} {row['rps']:>8.1f} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+            f"{row['p99_ms']:>8.2f} {row['max_ms']:>8.2f} {_fmt(row['avg_queries'], '7.2f')} "
+            f"{_fmt(row['max_queries'], '7d')} {_fmt(row['avg_db_ms'], '6.2f')}  "
+            + ", ".join(f"{status}×{count}" for status, count in sorted(row["statuses"].items()))
+        )
+        old = baseline.get(name)
+        if old:
+            line += f"  {row['p95_ms'] / old['p95_ms'] - 1:+.1%} / {_delta(row['avg_queries'], old['avg_queries'])}"
+        print(line)
+    print(
+        f"\nВсего: {total['requests']} запросов за {total['elapsed']:.2f} с "
+        f"({total['rps']:.1f} req/s, конкурентность {total['concurrency']})"
+    )
+
+
+def _fmt(value, spec: str) -> str:
+    width = int(spec.split(".")[0].rstrip("df"))
+    return f"{'—':>{width}}" if value is None else format(value, spec)
+
+
+def _delta(new, old) -> str:
+    if new is None or old is None:
+        return "—"
+    return f"{new - old:+.2f}"
+
+
+def find_regressions(report: dict, baseline: dict, max_regression: float) -> list:
+    regressions = []
+    for name, row in report.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        if row["p95_ms"] > old["p95_ms"] * (1 + max_regression):
+            regressions.append(f"{name}: p95 {old['p95_ms']:.2f} → {row['p95_ms']:.2f} мс")
+        if row["max_queries"] is not None and old["max_queries"] is not None \
+                and row["max_queries"] > old["max_queries"]:
+            regressions.append(f"{name}: SQL-запросов {old['max_queries']} → {row['max_queries']}")
+    return regressions
+
+
+def parse_mix(value: str) -> dict:
+    value = MIXES.get(value, value)
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+# ==================== MAIN ====================
+
+async def main(args):
+    # Настройки читаются при импорте app, поэтому окружение — до него
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["DATABASE_READ_URL"] = ""
+    os.environ["TELEGRAM_BOT_TOKEN"] = BOT_TOKEN
+    os.environ["ADMIN_PASSWORD"] = ADMIN_PASSWORD
+    os.environ["DB_POOL_SIZE"] = str(args.pool_size)
+
+    from app.main import app
+    from app.database import init_db
+    import httpx
+
+    await init_db()
+    players = await seed_players(args.players, args.seed)
+    print(f"[✓] Создано игроков: {len(players)}", file=sys.stderr)
+
+    mix = parse_mix(args.mix)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            if args.warmup:
+                await LoadTest(client, players, args.seed + 1).run(mix, args.warmup, args.concurrency)
+
+            load_test = LoadTest(client, players, args.seed)
+            elapsed = await load_test.run(mix, args.requests, args.concurrency)
+
+    report = summarize(load_test.samples, elapsed)
+    requests_done = sum(row["count"] for row in report.values())
+    total = {
+        "requests": requests_done,
+        "elapsed": elapsed,
+        "rps": requests_done / elapsed,
+        "concurrency": args.concurrency,
+    }
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["requests"]
+
+    print_report(report, total, baseline)
+
+    result = {
+        "python": platform.python_version(),
+        "database": args.database_url.split(":", 1)[0],
+        "players": args.players,
+        "mix": mix,
+        "seed": args.seed,
+        "total": total,
+        "requests": report,
+    }
+    for path in filter(None, (args.json, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"[✓] Результаты сохранены в {path}")
+
+    if baseline and args.max_regression is not None:
+        regressions = find_regressions(report, baseline, args.max_regression)
+        if regressions:
+            print("[!] Регрессии относительно baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("[✓] Регрессий нет")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузочный тест бэкенда")
+    parser.add_argument("--database-url", help="по умолчанию — свежий SQLite-файл во временной папке")
+    parser.add_argument("--players", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=2000, help="число сценариев за прогон")
+    parser.add_argument("--warmup", type=int, default=100, help="сценариев на прогрев (не считаются)")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--mix", default="default",
+                        help=f"пресет ({', '.join(MIXES)}) или сценарий=вес через запятую")
+    parser.add_argument("--pool-size", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="сохранить результаты в JSON")
+    parser.add_argument("--save-baseline", help="сохранить результаты как baseline")
+    parser.add_argument("--baseline", help="сравнить с baseline")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="код выхода 1, если p95 вырос больше чем на эту долю или выросло число SQL-запросов")
+    args = parser.parse_args()
+
+    unknown = [name for name in parse_mix(args.mix) if not hasattr(LoadTest, f"scenario_{name}")]
+    if unknown:
+        parser.error(f"неизвестные сценарии: {', '.join(unknown)}")
+
+    if not args.database_url:
+        path = os.path.join(tempfile.mkdtemp(prefix="sqwoz-loadtest-"), "loadtest.db")
+        args.database_url = f"sqlite+aiosqlite:///{path}"
+
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,147 @@
+"""baseline: схема, которую раньше создавал create_all
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+
+Базы, созданные через Base.metadata.create_all, уже содержат эти таблицы —
+для них ревизия ничего не делает и только отмечается как применённая.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "players" not in existing:
+        op.create_table(
+            "players",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("telegram_id", sa.BigInteger(), nullable=False),
+            sa.Column("username", sa.String(100), nullable=True),
+            sa.Column("first_name", sa.String(100), nullable=True),
+            sa.Column("last_name", sa.String(100), nullable=True),
+            sa.Column("balance", sa.Integer(), nullable=True),
+            sa.Column("total_earned", sa.Integer(), nullable=True),
+            sa.Column("total_spent", sa.Integer(), nullable=True),
+            sa.Column("ban_count", sa.Integer(), nullable=True),
+            sa.Column("current_buyout_price", sa.Integer(), nullable=True),
+            sa.Column("is_banned", sa.Boolean(), nullable=True),
+            sa.Column("ban_expires_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("last_ban_reason", sa.String(50), nullable=True),
+            sa.Column("last_ban_word", sa.String(100), nullable=True),
+            sa.Column("personal_banwords", sa.JSON(), nullable=True),
+            sa.Column("games_played", sa.Integer(), nullable=True),
+            sa.Column("games_won", sa.Integer(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("last_active_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_players_id", "players", ["id"])
+        op.create_index("ix_players_telegram_id", "players", ["telegram_id"], unique=True)
+
+    if "ban_history" not in existing:
+        op.create_table(
+            "ban_history",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("player_id", sa.Integer(), sa.ForeignKey("players.id"), nullable=False),
+            sa.Column("reason", sa.String(50), nullable=False),
+            sa.Column("word", sa.String(100), nullable=True),
+            sa.Column("multiplier", sa.Integer(), nullable=True),
+            sa.Column("buyout_price", sa.Integer(), nullable=False),
+            sa.Column("was_paid", sa.Boolean(), nullable=True),
+            sa.Column("duration_hours", sa.Integer(), nullable=False),
+            sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("paid_at", sa.DateTime(timezone=True), nullable=True),
+        )
+        op.create_index("ix_ban_history_id", "ban_history", ["id"])
+
+    if "game_sessions" not in existing:
+        op.create_table(
+            "game_sessions",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("player_id", sa.Integer(), sa.ForeignKey("players.id"), nullable=False),
+            sa.Column("game_type", sa.String(50), nullable=False),
+            sa.Column("score", sa.Integer(), nullable=True),
+            sa.Column("bet_amount", sa.Integer(), nullable=True),
+            sa.Column("win_amount", sa.Integer(), nullable=True),
+            sa.Column("is_win", sa.Boolean(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_game_sessions_id", "game_sessions", ["id"])
+
+    if "global_settings" not in existing:
+        op.create_table(
+            "global_settings",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("key", sa.String(100), nullable=False, unique=True),
+            sa.Column("value", sa.Text(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        )
+        op.create_index("ix_global_settings_id", "global_settings", ["id"])
+
+    if "weekly_banwords" not in existing:
+        op.create_table(
+            "weekly_banwords",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("word", sa.String(100), nullable=False),
+            sa.Column("is_active", sa.Boolean(), nullable=True),
+            sa.Column("week_number", sa.Integer(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("expires_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("times_triggered", sa.Integer(), nullable=True),
+        )
+        op.create_index("ix_weekly_banwords_id", "weekly_banwords", ["id"])
+
+    if "global_banwords" not in existing:
+        op.create_table(
+            "global_banwords",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("word", sa.String(100), nullable=False, unique=True),
+            sa.Column("is_active", sa.Boolean(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("times_triggered", sa.Integer(), nullable=True),
+        )
+        op.create_index("ix_global_banwords_id", "global_banwords", ["id"])
+
+    if "chat_settings" not in existing:
+        op.create_table(
+            "chat_settings",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("chat_id", sa.BigInteger(), nullable=False, unique=True),
+            sa.Column("chat_title", sa.String(255), nullable=True),
+            sa.Column("notify_on_ban", sa.Boolean(), nullable=True),
+            sa.Column("notify_on_unban", sa.Boolean(), nullable=True),
+            sa.Column("notify_weekly_word", sa.Boolean(), nullable=True),
+            sa.Column("games_enabled", sa.Boolean(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        )
+        op.create_index("ix_chat_settings_id", "chat_settings", ["id"])
+
+    if "lottery_word_pool" not in existing:
+        op.create_table(
+            "lottery_word_pool",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("word", sa.String(100), nullable=False, unique=True),
+            sa.Column("is_active", sa.Boolean(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("times_used", sa.Integer(), nullable=True),
+        )
+        op.create_index("ix_lottery_word_pool_id", "lottery_word_pool", ["id"])
+
+
+def downgrade():
+    for table in (
+        "lottery_word_pool", "chat_settings", "global_banwords", "weekly_banwords",
+        "global_settings", "game_sessions", "ban_history", "players",
+    ):
+        op.drop_table(table)
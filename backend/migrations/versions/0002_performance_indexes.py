@@ -0,0 +1,108 @@
+"""индексы под горячие запросы и таблица счётчиков
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def _existing_indexes(table: str) -> set:
+    """
+    Имена готовых индексов таблицы.
+
+    Прерванный CREATE INDEX CONCURRENTLY оставляет в Postgres невалидный
+    индекс под тем же именем — такой удаляем, чтобы построить заново.
+    """
+    bind = op.get_bind()
+    names = {ix["name"] for ix in sa.inspect(bind).get_indexes(table)}
+    if bind.dialect.name == "postgresql":
+        invalid = bind.execute(
+            sa.text(
+                "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE i.indrelid = CAST(:table AS regclass) AND NOT i.indisvalid"
+            ),
+            {"table": table},
+        ).scalars().all()
+        for name in invalid:
+            with op.get_context().autocommit_block():
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+            names.discard(name)
+    return names
+
+
+def upgrade():
+    bind = op.get_bind()
+    is_postgres = bind.dialect.name == "postgresql"
+    active = sa.text("is_active IS true")
+
+    # Таблица могла появиться раньше через create_all
+    if not sa.inspect(bind).has_table("platform_counters"):
+        op.create_table(
+            "platform_counters",
+            sa.Column("key", sa.String(50), primary_key=True),
+            sa.Column("value", sa.BigInteger(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+
+    indexes = {
+        "players": [
+            ("ix_players_balance_id", ["balance", "id"], {}),
+            ("ix_players_last_active_at", ["last_active_at"], {}),
+            # text_pattern_ops — чтобы LIKE 'abc%' шёл по индексу при любой collation
+            (
+                "ix_players_username_lower",
+                [sa.func.lower(sa.column("username")).label("username_lower")],
+                {"postgresql_ops": {"username_lower": "text_pattern_ops"}},
+            ),
+        ],
+        "ban_history": [
+            ("ix_ban_history_player_paid_created", ["player_id", "was_paid", "created_at"], {}),
+        ],
+        "game_sessions": [
+            ("ix_game_sessions_player_created", ["player_id", "created_at"], {}),
+        ],
+        "global_banwords": [
+            ("ix_global_banwords_active_word", ["word"],
+             {"postgresql_where": active, "sqlite_where": active}),
+        ],
+        "weekly_banwords": [
+            ("ix_weekly_banwords_active_created", ["created_at"],
+             {"postgresql_where": active, "sqlite_where": active}),
+        ],
+        "lottery_word_pool": [
+            ("ix_lottery_word_pool_active_used", ["times_used"],
+             {"postgresql_where": active, "sqlite_where": active}),
+        ],
+    }
+
+    for table, table_indexes in indexes.items():
+        existing = _existing_indexes(table)
+        for name, columns, kwargs in table_indexes:
+            if name in existing:
+                continue
+            if is_postgres:
+                # Без блокировки записи в таблицу на время построения
+                with op.get_context().autocommit_block():
+                    op.create_index(name, table, columns, postgresql_concurrently=True, **kwargs)
+            else:
+                op.create_index(name, table, columns, **kwargs)
+
+
+def downgrade():
+    op.drop_index("ix_lottery_word_pool_active_used", table_name="lottery_word_pool")
+    op.drop_index("ix_weekly_banwords_active_created", table_name="weekly_banwords")
+    op.drop_index("ix_global_banwords_active_word", table_name="global_banwords")
+    op.drop_index("ix_game_sessions_player_created", table_name="game_sessions")
+    op.drop_index("ix_ban_history_player_paid_created", table_name="ban_history")
+    op.drop_index("ix_players_username_lower", table_name="players")
+    op.drop_index("ix_players_last_active_at", table_name="players")
+    op.drop_index("ix_players_balance_id", table_name="players")
+    op.drop_table("platform_counters")
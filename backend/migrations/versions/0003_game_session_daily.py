@@ -0,0 +1,77 @@
+"""дневные итоги игр и индекс для удаления старых сессий
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    is_postgres = bind.dialect.name == "postgresql"
+
+    if not sa.inspect(bind).has_table("game_session_daily"):
+        op.create_table(
+            "game_session_daily",
+            sa.Column("player_id", sa.Integer(), sa.ForeignKey("players.id"), primary_key=True),
+            sa.Column("game_type", sa.String(50), primary_key=True),
+            sa.Column("day", sa.Date(), primary_key=True),
+            sa.Column("plays", sa.Integer(), nullable=False),
+            sa.Column("wins", sa.Integer(), nullable=False),
+            sa.Column("total_bet", sa.BigInteger(), nullable=False),
+            sa.Column("total_win", sa.BigInteger(), nullable=False),
+            sa.Column("best_score", sa.Integer(), nullable=False),
+        )
+
+        # Итоги по уже накопленной истории
+        day = "(created_at AT TIME ZONE 'UTC')::date" if is_postgres else "date(created_at)"
+        op.execute(f"""
+            INSERT INTO game_session_daily
+                (player_id, game_type, day, plays, wins, total_bet, total_win, best_score)
+            SELECT
+                player_id, game_type, {day},
+                count(*),
+                sum(CASE WHEN is_win THEN 1 ELSE 0 END),
+                coalesce(sum(bet_amount), 0),
+                coalesce(sum(win_amount), 0),
+                coalesce(max(score), 0)
+            FROM game_sessions
+            GROUP BY player_id, game_type, {day}
+        """)
+
+    existing = {ix["name"] for ix in sa.inspect(bind).get_indexes("game_sessions")}
+    if is_postgres and "ix_game_sessions_created_at" in existing:
+        # Прерванный CREATE INDEX CONCURRENTLY оставляет невалидный индекс — строим заново
+        is_valid = bind.execute(sa.text(
+            "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = 'ix_game_sessions_created_at'"
+        )).scalar()
+        if not is_valid:
+            with op.get_context().autocommit_block():
+                op.drop_index(
+                    "ix_game_sessions_created_at", table_name="game_sessions",
+                    postgresql_concurrently=True, if_exists=True
+                )
+            existing.discard("ix_game_sessions_created_at")
+    if "ix_game_sessions_created_at" not in existing:
+        if is_postgres:
+            with op.get_context().autocommit_block():
+                op.create_index(
+                    "ix_game_sessions_created_at", "game_sessions", ["created_at"],
+                    postgresql_concurrently=True
+                )
+        else:
+            op.create_index("ix_game_sessions_created_at", "game_sessions", ["created_at"])
+
+
+def downgrade():
+    op.drop_index("ix_game_sessions_created_at", table_name="game_sessions")
+    op.drop_table("game_session_daily")
@@ -0,0 +1,83 @@
+"""статистика игроков по типам игр
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table("player_game_stats"):
+        return
+
+    op.create_table(
+        "player_game_stats",
+        sa.Column("player_id", sa.Integer(), sa.ForeignKey("players.id"), primary_key=True),
+        sa.Column("game_type", sa.String(50), primary_key=True),
+        sa.Column("plays", sa.Integer(), nullable=False),
+        sa.Column("wins", sa.Integer(), nullable=False),
+        sa.Column("net_profit", sa.BigInteger(), nullable=False),
+        sa.Column("best_score", sa.Integer(), nullable=False),
+        sa.Column("current_streak", sa.Integer(), nullable=False),
+        sa.Column("best_streak", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+    # Суммы берём из дневных итогов (сырые сессии могли быть уже удалены),
+    # серии побед — из оставшихся сессий: отрезки подряд идущих is_win
+    op.execute("""
+        INSERT INTO player_game_stats
+            (player_id, game_type, plays, wins, net_profit, best_score, current_streak, best_streak)
+        WITH totals AS (
+            SELECT player_id, game_type,
+                   sum(plays) AS plays, sum(wins) AS wins,
+                   sum(total_win) - sum(total_bet) AS net_profit,
+                   max(best_score) AS best_score
+            FROM game_session_daily
+            GROUP BY player_id, game_type
+        ),
+        ordered AS (
+            SELECT player_id, game_type, id, is_win,
+                   row_number() OVER (PARTITION BY player_id, game_type ORDER BY id)
+                   - row_number() OVER (PARTITION BY player_id, game_type, is_win ORDER BY id) AS grp
+            FROM game_sessions
+        ),
+        runs AS (
+            SELECT player_id, game_type, grp, count(*) AS length, max(id) AS last_id
+            FROM ordered
+            WHERE is_win
+            GROUP BY player_id, game_type, grp
+        ),
+        best_runs AS (
+            SELECT player_id, game_type, max(length) AS best_streak
+            FROM runs
+            GROUP BY player_id, game_type
+        ),
+        last_games AS (
+            SELECT player_id, game_type, max(id) AS last_id
+            FROM game_sessions
+            GROUP BY player_id, game_type
+        )
+        SELECT t.player_id, t.game_type, t.plays, t.wins, t.net_profit, t.best_score,
+               coalesce(cur.length, 0), coalesce(b.best_streak, 0)
+        FROM totals t
+        LEFT JOIN best_runs b
+               ON b.player_id = t.player_id AND b.game_type = t.game_type
+        LEFT JOIN last_games l
+               ON l.player_id = t.player_id AND l.game_type = t.game_type
+        LEFT JOIN runs cur
+               ON cur.player_id = t.player_id AND cur.game_type = t.game_type
+              AND cur.last_id = l.last_id
+    """)
+
+
+def downgrade():
+    op.drop_table("player_game_stats")
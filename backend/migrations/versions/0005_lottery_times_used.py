@@ -0,0 +1,75 @@
+"""times_used пула лотереи без NULL и индекс (times_used, id)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+NEW_INDEX = "ix_lottery_word_pool_active_used_id"
+OLD_INDEX = "ix_lottery_word_pool_active_used"
+
+
+def upgrade():
+    bind = op.get_bind()
+    is_postgres = bind.dialect.name == "postgresql"
+    active = sa.text("is_active IS true")
+
+    # NULL + 1 остаётся NULL, а NULL сортируется последним — такие слова не разыгрывались бы
+    op.execute("UPDATE lottery_word_pool SET times_used = 0 WHERE times_used IS NULL")
+    with op.batch_alter_table("lottery_word_pool") as batch:
+        batch.alter_column(
+            "times_used", existing_type=sa.Integer(), nullable=False, server_default="0"
+        )
+
+    existing = {ix["name"] for ix in sa.inspect(bind).get_indexes("lottery_word_pool")}
+    if is_postgres and NEW_INDEX in existing:
+        # Прерванный CREATE INDEX CONCURRENTLY оставляет невалидный индекс — строим заново
+        is_valid = bind.execute(sa.text(
+            "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name"
+        ), {"name": NEW_INDEX}).scalar()
+        if not is_valid:
+            with op.get_context().autocommit_block():
+                op.drop_index(
+                    NEW_INDEX, table_name="lottery_word_pool",
+                    postgresql_concurrently=True, if_exists=True
+                )
+            existing.discard(NEW_INDEX)
+
+    if is_postgres:
+        with op.get_context().autocommit_block():
+            if NEW_INDEX not in existing:
+                op.create_index(
+                    NEW_INDEX, "lottery_word_pool", ["times_used", "id"],
+                    postgresql_where=active, postgresql_concurrently=True
+                )
+            op.drop_index(
+                OLD_INDEX, table_name="lottery_word_pool",
+                postgresql_concurrently=True, if_exists=True
+            )
+    else:
+        if NEW_INDEX not in existing:
+            op.create_index(NEW_INDEX, "lottery_word_pool", ["times_used", "id"], sqlite_where=active)
+        if OLD_INDEX in existing:
+            op.drop_index(OLD_INDEX, table_name="lottery_word_pool")
+
+
+def downgrade():
+    op.create_index(
+        OLD_INDEX, "lottery_word_pool", ["times_used"],
+        postgresql_where=sa.text("is_active IS true"), sqlite_where=sa.text("is_active IS true")
+    )
+    op.drop_index(NEW_INDEX, table_name="lottery_word_pool")
+    with op.batch_alter_table("lottery_word_pool") as batch:
+        batch.alter_column(
+            "times_used", existing_type=sa.Integer(), nullable=True, server_default=None
+        )
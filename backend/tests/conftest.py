@@ -0,0 +1,44 @@
+import asyncio
+import os
+import sys
+import tempfile
+
+# Настройки читаются при импорте app — окружение выставляем до него
+_db_dir = tempfile.mkdtemp(prefix="sqwoz-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ["DATABASE_READ_URL"] = ""
+os.environ["TELEGRAM_BOT_TOKEN"] = ""  # без подписи initData
+os.environ["ADMIN_PASSWORD"] = "test-admin"
+os.environ["QUERY_BUDGET_ENFORCE"] = "true"
+os.environ["DB_POOL_WARMUP"] = "false"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.database import init_db  # noqa: E402
+from app.main import app  # noqa: E402
+
+ADMIN_HEADERS = {"X-Admin-Password": "test-admin"}
+
+
+@pytest.fixture(scope="session")
+def client():
+    asyncio.run(init_db())
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def login(client):
+    """Войти игроком через WebApp: (заголовки с токеном, ответ авторизации)"""
+    def do_login(telegram_id: int, **profile):
+        response = client.post(
+            "/auth/telegram/webapp",
+            json={"user": {"id": telegram_id, **profile}}
+        )
+        assert response.status_code == 200, response.text
+        data = response.json()
+        return {"Authorization": f"Bearer {data['access_token']}"}, data
+    return do_login
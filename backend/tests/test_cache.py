@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from app.cache import TTLCache
+
+
+def test_get_or_compute_runs_factory_once_for_concurrent_misses():
+    calls = 0
+
+    async def factory():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        cache = TTLCache(ttl=60)
+        results = await asyncio.gather(*(cache.get_or_compute("key", factory) for _ in range(5)))
+        assert results == ["value"] * 5
+        assert cache.get("key") == "value"
+
+    asyncio.run(main())
+    assert calls == 1
+
+
+def test_cancelled_leader_does_not_cancel_waiters():
+    async def factory():
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        cache = TTLCache(ttl=60)
+        leader = asyncio.create_task(cache.get_or_compute("key", factory))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_compute("key", factory))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert await waiter == "value"
+        assert cache.get("key") == "value"
+
+    asyncio.run(main())
+
+
+def test_factory_error_reaches_every_waiter_and_is_not_cached():
+    async def factory():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def main():
+        cache = TTLCache(ttl=60)
+        results = await asyncio.gather(
+            *(cache.get_or_compute("key", factory) for _ in range(3)), return_exceptions=True
+        )
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert cache.get("key") is None
+
+    asyncio.run(main())
@@ -0,0 +1,19 @@
+from app.config import settings
+from conftest import ADMIN_HEADERS
+
+
+def test_metrics_require_admin_password(client):
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"X-Admin-Password": "wrong"}).status_code == 401
+
+    response = client.get("/metrics", headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    assert "http_requests_total" in response.text
+
+
+def test_metrics_accept_scrape_token(client, monkeypatch):
+    assert client.get("/metrics", headers={"Authorization": "Bearer "}).status_code == 401
+
+    monkeypatch.setattr(settings, "metrics_token", "scrape-token")
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape-token"}).status_code == 200
+    assert client.get("/metrics", headers={"Authorization": "Bearer other"}).status_code == 401
@@ -0,0 +1,105 @@
+"""
+Бюджеты SQL-запросов эндпоинтов (@query_budget)
+
+Тесты идут с QUERY_BUDGET_ENFORCE=true: превышение бюджета роняет запрос
+с QueryBudgetExceeded, и TestClient пробрасывает его в тест.
+"""
+import asyncio
+
+from sqlalchemy import delete
+
+from app.crud import admin_stats_cache
+from app.database import async_session_maker
+from app.models import PlatformCounter
+
+from conftest import ADMIN_HEADERS
+
+
+def _clear_platform_counters():
+    async def clear():
+        async with async_session_maker() as db:
+            await db.execute(delete(PlatformCounter))
+            await db.commit()
+    asyncio.run(clear())
+
+
+# === Auth ===
+
+def test_webapp_auth_new_returning_and_changed_profile(login):
+    _, data = login(1001, username="first")
+    assert data["is_new"] is True
+    _, data = login(1001, username="first")
+    assert data["is_new"] is False
+    _, data = login(1001, username="renamed")
+    assert data["player"]["username"] == "renamed"
+
+
+# === Players ===
+
+def test_player_reads(client, login):
+    headers, _ = login(1002, username="reader")
+    assert client.get("/players/leaderboard", params={"limit": 100}).status_code == 200
+    assert client.get("/players/me", headers=headers).status_code == 200
+    assert client.get("/players/me/rank", headers=headers).status_code == 200
+    assert client.get("/players/me/bans", headers=headers).status_code == 200
+    assert client.get("/players/me/stats", headers=headers).status_code == 200
+    assert client.get("/players/1002/stats").status_code == 200
+
+
+def test_game_save(client, login):
+    headers, _ = login(1003)
+    for is_win in (True, False):
+        response = client.post(
+            "/players/me/games",
+            json={"game_type": "slots", "bet_amount": 10, "win_amount": 20 if is_win else 0, "is_win": is_win},
+            headers=headers
+        )
+        assert response.status_code == 200, response.text
+
+
+def test_personal_banwords(client, login):
+    headers, _ = login(1004)
+    response = client.post("/players/me/banwords", params={"word": "Кек"}, headers=headers)
+    assert response.status_code == 200, response.text
+    response = client.delete("/players/me/banwords/кек", headers=headers)
+    assert response.status_code == 200, response.text
+
+
+def test_ban_and_buyout(client, login):
+    headers, data = login(1005)
+    response = client.post(f"/admin/players/{data['player']['id']}/ban", headers=ADMIN_HEADERS)
+    assert response.status_code == 200, response.text
+    response = client.post("/players/me/buyout", headers=headers)
+    assert response.status_code == 200, response.text
+
+
+# === Admin ===
+
+def test_admin_stats(client):
+    assert client.get("/admin/stats", headers=ADMIN_HEADERS).status_code == 200
+
+
+def test_admin_stats_without_counters(client):
+    # Счётчики ещё не заведены — статистика считается по таблицам
+    _clear_platform_counters()
+    admin_stats_cache.clear()
+    try:
+        assert client.get("/admin/stats", headers=ADMIN_HEADERS).status_code == 200
+    finally:
+        response = client.post("/admin/counters/reconcile", headers=ADMIN_HEADERS)
+        assert response.status_code == 200
+
+
+def test_admin_lists(client):
+    for path in ("/admin/players", "/admin/banwords", "/admin/banwords/weekly", "/admin/lottery-words"):
+        assert client.get(path, headers=ADMIN_HEADERS).status_code == 200, path
+    assert client.get("/admin/players", params={"compact": True}, headers=ADMIN_HEADERS).status_code == 200
+
+
+def test_admin_banword_and_weekly_lottery(client):
+    response = client.post("/admin/banwords", json={"word": "тестслово"}, headers=ADMIN_HEADERS)
+    assert response.status_code == 200, response.text
+    response = client.post("/admin/lottery-words/bulk", json=["альфа", "бета"], headers=ADMIN_HEADERS)
+    assert response.status_code == 200, response.text
+    response = client.post("/admin/banwords/weekly/lottery", headers=ADMIN_HEADERS)
+    assert response.status_code == 200, response.text
@@ -0,0 +1,58 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.ranking import BalanceRanking
+
+
+class _SlowDb:
+    """Сессия, чей SELECT отдаёт снимок и ждёт, пока тест не отпустит его"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def execute(self, _statement):
+        self.started.set()
+        await self.release.wait()
+        return SimpleNamespace(all=lambda: list(self.rows))
+
+
+def _player(player_id: int, balance: int, is_banned: bool = False):
+    return SimpleNamespace(id=player_id, balance=balance, is_banned=is_banned)
+
+
+def test_sync_during_load_is_applied_on_top_of_snapshot():
+    async def main():
+        ranking = BalanceRanking()
+        db = _SlowDb([(1, 100), (2, 200), (3, 300)])
+        load = asyncio.create_task(ranking.ensure_loaded(db))
+        await db.started.wait()
+        # Коммиты после снимка SELECT
+        assert ranking.sync(_player(1, 500)) is True
+        assert ranking.sync(_player(3, 300, is_banned=True)) is True
+        assert ranking.sync(_player(4, 150)) is True
+        db.release.set()
+        await load
+
+        assert ranking.total == 3
+        assert ranking.rank_of(1, 500) == 1
+        assert ranking.rank_of(2, 200) == 2
+        assert ranking.rank_of(4, 150) == 3
+        above, below = ranking.neighbours(2, 200, 1)
+        assert above == [(1, 1)] and below == [(3, 4)]
+
+    asyncio.run(main())
+
+
+def test_sync_reports_top_changes_after_load():
+    async def main():
+        ranking = BalanceRanking()
+        db = _SlowDb([(player_id, player_id * 10) for player_id in range(1, 6)])
+        db.release.set()
+        await ranking.ensure_loaded(db)
+        assert ranking.sync(_player(1, 15), top=2) is False
+        assert ranking.sync(_player(1, 100), top=2) is True
+        assert ranking.sync(_player(1, 10), top=2) is True
+
+    asyncio.run(main())
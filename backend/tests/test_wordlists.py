@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from app.wordlists import (
+    ImportFormatError, ImportInProgress, ImportRegistry, WordSet, iter_record_batches, parse_records,
+)
+
+
+def _parse(body: bytes, fmt: str, word_set: str = WordSet.GLOBAL, piece: int = 3, batch_size: int = 2) -> list:
+    async def stream():
+        for i in range(0, len(body), piece):
+            yield body[i:i + piece]
+
+    async def main():
+        progress = ImportRegistry().start(word_set, fmt)
+        rows = []
+        async for records in iter_record_batches(stream(), fmt, batch_size, progress):
+            rows.extend(parse_records(records, fmt, word_set, progress))
+        return rows
+
+    return asyncio.run(main())
+
+
+def test_csv_quoted_newline_spans_chunks_and_batches():
+    body = 'word\r\nальфа\r\n"много\r\nстрок, слово"\r\n"с ""кавычками"""\r\nбета\r\n'.encode()
+    assert _parse(body, "csv") == ["альфа", "много\nстрок, слово", 'с "кавычками"', "бета"]
+
+
+def test_text_skips_comments_and_blank_lines():
+    assert _parse("﻿альфа\n# комментарий\n\n бета \n".encode("utf-8"), "text") == ["альфа", "бета"]
+
+
+def test_personal_rows_and_header():
+    body = b"telegram_id,word\n111,kek\n222 lol\n"
+    assert _parse(body, "csv", WordSet.PERSONAL) == [(111, "kek"), (222, "lol")]
+    with pytest.raises(ImportFormatError, match="Строка 3"):
+        _parse(b"111,kek\n222,lol\nnope,x\n", "csv", WordSet.PERSONAL)
+
+
+def test_unterminated_quote_is_a_format_error():
+    with pytest.raises(ImportFormatError, match="Строка 2"):
+        _parse(b'a\n"unterminated\nb\n', "csv")
+
+
+def test_running_import_id_cannot_be_reused():
+    registry = ImportRegistry()
+    progress = registry.start(WordSet.GLOBAL, "text", "backup")
+    with pytest.raises(ImportInProgress):
+        registry.start(WordSet.GLOBAL, "text", "backup")
+    progress.finish()
+    assert registry.start(WordSet.GLOBAL, "text", "backup").status == "running"
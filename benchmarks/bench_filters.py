@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк проверки банвордов (BanWordChecker.check_text)
+
+Гоняет движки проверки по синтетическим (и, если указать --corpus, записанным)
+сообщениям при разных размерах списка слов, длинах сообщений и доле попаданий.
+Считает пропускную способность, p50/p99 задержки и память, сравнивает с
+сохранённым baseline. Работает офлайн: слова берутся из banned_words.txt
+плюс сгенерированные.
+
+    python benchmarks/bench_filters.py
+    python benchmarks/bench_filters.py --sizes 100,1000 --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_filters.py --baseline benchmarks/baseline.json --max-regression 0.1
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from filters import BanWordChecker, load_banned_words  # noqa: E402
+
+
+USER_ID = 1
+PERSONAL_WORDS = 20
+WEEKLY_WORDS = 5
+
+LETTERS = "абвгдеёжзийклмнопрстуфхцчшщъыьэюя"
+FILLER = (
+    "привет как дела что делаешь сегодня завтра вечером пойдём играть слоты скачки "
+    "ставка баланс выкуп бан чат конфа го ну да нет норм ок лол кек спасибо пока "
+    "hello ok lol gg wp brb afk"
+).split()
+
+
+# ==================== ДВИЖКИ ====================
+
+def engine_checker(global_words, weekly_words, personal_words):
+    """Текущая реализация: BanWordChecker.check_text"""
+    checker = BanWordChecker()
+    checker.global_words = list(global_words)
+    checker.weekly_words = list(weekly_words)
+    checker.personal_words = {USER_ID: list(personal_words)}
+    return checker, lambda text: checker.check_text(text, USER_ID)
+
+
+# Новые движки добавлять сюда: имя -> фабрика (global, weekly, personal) -> (объект, check)
+ENGINES = {
+    "checker": engine_checker,
+}
+
+
+# ==================== ДАННЫЕ ====================
+
+def generate_words(rng: random.Random, base: list, size: int) -> list:
+    """Список из size слов: banned_words.txt, добитый случайными словами"""
+    words = list(dict.fromkeys(base))[:size]
+    seen = set(words)
+    while len(words) < size:
+        word = "".join(rng.choice(LETTERS) for _ in range(rng.randint(6, 12)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+def clean_filler(patterns: list) -> list:
+    """Слова-наполнители, в которых нет ни одного банворда (иначе hit rate поплывёт)"""
+    return [word for word in FILLER if not any(pattern in word for pattern in patterns)]
+
+
+def generate_messages(rng: random.Random, filler: list, words: list, count: int, length: int,
+                      hit_rate: float) -> list:
+    """Сообщения примерно по length символов; доля hit_rate содержит банворд"""
+    messages = []
+    for _ in range(count):
+        parts = []
+        size = 0
+        while size < length:
+            part = rng.choice(filler)
+            parts.append(part)
+            size += len(part) + 1
+        if rng.random() < hit_rate:
+            parts.insert(rng.randrange(len(parts) + 1), rng.choice(words))
+        messages.append(" ".join(parts))
+    return messages
+
+
+def load_corpus(path: str) -> list:
+    """
+    Записанный корпус: текст построчно или JSONL с {"text": ...}
+    либо Telegram Update ({"message": {"text": ...}})
+    """
+    messages = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if not line.startswith("{"):
+                messages.append(line)
+                continue
+            data = json.loads(line)
+            message = data.get("message") or data.get("edited_message") or data
+            if message.get("text"):
+                messages.append(message["text"])
+    return messages
+
+
+# ==================== ЗАМЕРЫ ====================
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return sorted_values[idx]
+
+
+def run_case(engine_name: str, words: list, weekly: list, personal: list, messages: list,
+             duration: float, min_calls: int) -> dict:
+    factory = ENGINES[engine_name]
+
+    # Память под структуры движка
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    engine, check = factory(words, weekly, personal)
+    index_bytes = sum(
+        stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(before, "filename")
+    )
+    # Пиковая память на самой проверке (без замера времени: tracemalloc замедляет)
+    tracemalloc.reset_peak()
+    base_current, _ = tracemalloc.get_traced_memory()
+    for text in messages[:200]:
+        check(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Прогрев
+    for text in messages[:50]:
+        check(text)
+
+    latencies = []
+    hits = 0
+    chars = 0
+    started = time.perf_counter()
+    deadline = started + duration
+    idx = 0
+    while len(latencies) < min_calls or time.perf_counter() < deadline:
+        text = messages[idx % len(messages)]
+        idx += 1
+        t0 = time.perf_counter_ns()
+        found, _, _ = check(text)
+        latencies.append(time.perf_counter_ns() - t0)
+        hits += bool(found)
+        chars += len(text)
+    elapsed = time.perf_counter() - started
+    del engine
+
+    latencies.sort()
+    calls = len(latencies)
+    return {
+        "calls": calls,
+        "msgs_per_sec": calls / elapsed,
+        "mb_per_sec": chars * 2 / elapsed / 1e6,  # UTF-8 кириллица ~2 байта на символ
+        "p50_us": percentile(latencies, 0.50) / 1000,
+        "p99_us": percentile(latencies, 0.99) / 1000,
+        "max_us": latencies[-1] / 1000,
+        "actual_hit_rate": hits / calls,
+        "index_kb": index_bytes / 1024,
+        "match_peak_kb": max(0, peak - base_current) / 1024,
+    }
+
+
+def case_key(case: dict) -> str:
+    return f"{case['engine']}/{case['corpus']}/words={case['words']}/len={case['length']}/hit={case['hit_rate']}"
+
+
+def print_table(results: list, baseline: dict):
+    header = f"{'case':<58} {'msg/s':>11} {'p50 µs':>9} {'p99 µs':>9} {'hit':>6} {'index KB':>9} {'peak KB':>8}"
+    if baseline:
+        header += f" {'Δ msg/s':>8} {'Δ p99':>8}"
+    print(header)
+    print("-" * len(header))
+    for case in results:
+        line = (
+            f"{case_key(case):<58} {case['msgs_per_sec']:>11,.0f} {case['p50_us']:>9.2f} "
+            f"{case['p99_us']:>9.2f} {case['actual_hit_rate']:>6.1%} {case['index_kb']:>9.0f} "
+            f"{case['match_peak_kb']:>8.1f}"
+        )
+        old = baseline.get(case_key(case))
+        if old:
+            line += (
+                f" {case['msgs_per_sec'] / old['msgs_per_sec'] - 1:>+8.1%}"
+                f" {case['p99_us'] / old['p99_us'] - 1:>+8.1%}"
+            )
+        print(line)
+
+
+def find_regressions(results: list, baseline: dict, max_regression: float) -> list:
+    regressions = []
+    for case in results:
+        old = baseline.get(case_key(case))
+        if not old:
+            continue
+        drop = 1 - case["msgs_per_sec"] / old["msgs_per_sec"]
+        if drop > max_regression:
+            regressions.append(f"{case_key(case)}: пропускная способность -{drop:.1%}")
+    return regressions
+
+
+def parse_list(value: str, cast):
+    return [cast(item) for item in value.split(",") if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк проверки банвордов")
+    parser.add_argument("--engines", default=",".join(ENGINES), help="движки через запятую")
+    parser.add_argument("--sizes", default="100,1000,10000,100000", help="размеры списка слов")
+    parser.add_argument("--lengths", default="20,200,2000", help="длины сообщений в символах")
+    parser.add_argument("--hit-rates", default="0,0.01,0.1", help="доли сообщений с банвордом")
+    parser.add_argument("--messages", type=int, default=1000, help="сообщений в синтетическом корпусе")
+    parser.add_argument("--corpus", help="записанный корпус (текст построчно или JSONL)")
+    parser.add_argument("--duration", type=float, default=0.5, help="секунд на один кейс")
+    parser.add_argument("--min-calls", type=int, default=50, help="минимум вызовов на кейс")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--words-file", default=os.path.join(ROOT, "banned_words.txt"))
+    parser.add_argument("--json", help="сохранить результаты в JSON")
+    parser.add_argument("--save-baseline", help="сохранить результаты как baseline")
+    parser.add_argument("--baseline", help="сравнить с baseline")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="код выхода 1, если msg/s упал больше чем на эту долю")
+    args = parser.parse_args()
+
+    engines = parse_list(args.engines, str)
+    unknown = [name for name in engines if name not in ENGINES]
+    if unknown:
+        parser.error(f"неизвестные движки: {', '.join(unknown)}")
+
+    base_words = load_banned_words(args.words_file)
+    corpus = load_corpus(args.corpus) if args.corpus else None
+
+    results = []
+    for size in parse_list(args.sizes, int):
+        rng = random.Random(f"{args.seed}-{size}")
+        words = generate_words(rng, base_words, size)
+        weekly = generate_words(rng, [], WEEKLY_WORDS)
+        personal = generate_words(rng, [], PERSONAL_WORDS)
+        filler = clean_filler(words + weekly + personal)
+
+        cases = []
+        if corpus:
+            cases.append(("recorded", corpus, sum(map(len, corpus)) // len(corpus), None))
+        for length in parse_list(args.lengths, int):
+            for hit_rate in parse_list(args.hit_rates, float):
+                msg_rng = random.Random(f"{args.seed}-{size}-{length}-{hit_rate}")
+                messages = generate_messages(msg_rng, filler, words, args.messages, length, hit_rate)
+                cases.append(("synthetic", messages, length, hit_rate))
+
+        for engine_name in engines:
+            for corpus_name, messages, length, hit_rate in cases:
+                result = run_case(
+                    engine_name, words, weekly, personal, messages, args.duration, args.min_calls
+                )
+                result.update(engine=engine_name, corpus=corpus_name, words=size,
+                              length=length, hit_rate=hit_rate)
+                results.append(result)
+                print(f"[bench] {case_key(result)}: {result['msgs_per_sec']:,.0f} msg/s", file=sys.stderr)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = {case_key(case): case for case in json.load(f)["results"]}
+
+    print_table(results, baseline)
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "seed": args.seed,
+        "results": results,
+    }
+    for path in filter(None, (args.json, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[✓] Результаты сохранены в {path}")
+
+    if baseline and args.max_regression is not None:
+        regressions = find_regressions(results, baseline, args.max_regression)
+        if regressions:
+            print("[!] Регрессии относительно baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("[✓] Регрессий нет")
+
+
+if __name__ == "__main__":
+    main()
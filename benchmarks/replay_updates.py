@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Проигрывание записанных Telegram-апдейтов через хендлеры бота
+
+Поднимает фейковый Bot API и заглушку бэкенда (оба на aiohttp, локально),
+регистрирует хендлеры из bot.py и подаёт апдейты из JSONL-файла (как их
+отдаёт getUpdates) с ускорением --speedup. Меряет задержку от подачи апдейта
+до deleteMessage, до запроса бана в бэкенд и до конца обработки, плюс
+пропускную способность. Без файла генерирует рейд (--generate N).
+
+    python benchmarks/replay_updates.py --generate 5000 --rate 200 --hit-rate 0.3
+    python benchmarks/replay_updates.py updates.jsonl --speedup 10 --api-latency-ms 50
+    python benchmarks/replay_updates.py --generate 2000 --save-generated raid.jsonl --speedup 0
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+
+from aiohttp import web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BOT_TOKEN = "123456:replay"
+BOT_USER = {"id": 123456, "is_bot": True, "first_name": "SQWOZ", "username": "sqwoz_replay_bot"}
+CHAT_ID = -1001000000000
+USER_ID_BASE = 20_000_000
+
+FILLER = (
+    "привет как дела что делаешь сегодня завтра вечером пойдём играть слоты скачки "
+    "ставка баланс выкуп бан чат конфа го ну да нет норм ок лол кек спасибо пока"
+).split()
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return sorted_values[idx]
+
+
+# ==================== ДАННЫЕ ====================
+
+def load_words(path: str) -> list:
+    # Не через filters.load_banned_words: импорт filters прочитает config до подмены API_URL
+    with open(path, encoding="utf-8") as f:
+        return [line.strip().lower() for line in f if line.strip()]
+
+
+def load_updates(path: str) -> list:
+    """JSONL: по апдейту на строку (поле replay_offset в секундах — необязательно)"""
+    updates = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                updates.append(json.loads(line))
+    return updates
+
+
+def generate_raid(count: int, users: int, rate: float, hit_rate: float, words: list, seed: int) -> list:
+    """Рейд: count сообщений от users участников со скоростью rate сообщений/с"""
+    rng = random.Random(seed)
+    started = int(time.time())
+    filler = [word for word in FILLER if not any(banned in word for banned in words)]
+    updates = []
+    for i in range(count):
+        user_id = USER_ID_BASE + rng.randrange(users)
+        parts = [rng.choice(filler) for _ in range(rng.randint(1, 12))]
+        if rng.random() < hit_rate:
+            parts.insert(rng.randrange(len(parts) + 1), rng.choice(words))
+        offset = i / rate if rate else 0.0
+        updates.append({
+            "update_id": i + 1,
+            "replay_offset": offset,
+            "message": {
+                "message_id": i + 1,
+                "date": started + int(offset),
+                "chat": {"id": CHAT_ID, "type": "supergroup", "title": "Replay"},
+                "from": {"id": user_id, "is_bot": False, "first_name": f"User {user_id}",
+                         "username": f"user{user_id}"},
+                "text": " ".join(parts),
+            },
+        })
+    return updates
+
+
+def replay_offsets(updates: list) -> list:
+    """Время подачи каждого апдейта относительно первого (в записанном темпе)"""
+    dates = [
+        (update.get("message") or update.get("edited_message") or {}).get("date", 0)
+        for update in updates
+    ]
+    first = min(dates, default=0)
+    return [
+        update.get("replay_offset", date - first)
+        for update, date in zip(updates, dates)
+    ]
+
+
+# ==================== ФЕЙКОВЫЙ BOT API И БЭКЕНД ====================
+
+class Recorder:
+    """Время подачи апдейтов и моменты, когда бот удалил сообщение и запросил бан"""
+
+    def __init__(self):
+        self.fed_at = {}  # (chat_id, message_id) -> (perf_counter, user_id)
+        self.pending_bans = {}  # user_id -> очередь времён подачи удалённых сообщений
+        self.delete_latency = []
+        self.ban_latency = []
+        self.done_latency = []
+        self.api_calls = {}
+
+    def feed(self, chat_id: int, message_id: int, user_id: int):
+        self.fed_at[(chat_id, message_id)] = (time.perf_counter(), user_id)
+
+    def deleted(self, chat_id: int, message_id: int):
+        fed = self.fed_at.get((chat_id, message_id))
+        if fed is None:
+            return
+        self.delete_latency.append(time.perf_counter() - fed[0])
+        self.pending_bans.setdefault(fed[1], deque()).append(fed[0])
+
+    def banned(self, user_id: int):
+        pending = self.pending_bans.get(user_id)
+        if pending:
+            self.ban_latency.append(time.perf_counter() - pending.popleft())
+
+    def done(self, chat_id: int, message_id: int):
+        fed = self.fed_at.get((chat_id, message_id))
+        if fed is not None:
+            self.done_latency.append(time.perf_counter() - fed[0])
+
+
+def fake_bot_api(recorder: Recorder, latency: float) -> web.Application:
+    """Минимальный Bot API: getMe, deleteMessage, sendMessage, остальное — ok"""
+    message_ids = iter(range(10 ** 9, 2 * 10 ** 9))
+
+    async def handle(request):
+        method = request.match_info["method"]
+        recorder.api_calls[method] = recorder.api_calls.get(method, 0) + 1
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+        if latency:
+            await asyncio.sleep(latency)
+
+        if method == "getMe":
+            result = BOT_USER
+        elif method == "deleteMessage":
+            recorder.deleted(int(params["chat_id"]), int(params["message_id"]))
+            result = True
+        elif method == "sendMessage":
+            chat_id = int(params["chat_id"])
+            result = {
+                "message_id": next(message_ids),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "supergroup"},
+                "from": BOT_USER,
+                "text": params.get("text", ""),
+            }
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", handle)
+    return app
+
+
+def stub_backend(recorder: Recorder, words: list, latency: float) -> web.Application:
+    """Заглушка бэкенда: списки банвордов и бан игрока"""
+    async def delay():
+        if latency:
+            await asyncio.sleep(latency)
+
+    async def global_words(request):
+        await delay()
+        return web.json_response([{"id": i, "word": word, "is_active": True} for i, word in enumerate(words)])
+
+    async def weekly_words(request):
+        await delay()
+        return web.json_response([])
+
+    async def personal_words(request):
+        await delay()
+        return web.json_response([])
+
+    async def ban(request):
+        recorder.banned(int(request.match_info["player_id"]))
+        await delay()
+        return web.json_response({"success": True, "ban_id": 1, "buyout_price": 100})
+
+    app = web.Application()
+    app.router.add_get("/admin/banwords", global_words)
+    app.router.add_get("/admin/banwords/weekly", weekly_words)
+    app.router.add_get("/players/{telegram_id}/banwords", personal_words)
+    app.router.add_post("/admin/players/{player_id}/ban", ban)
+    return app
+
+
+async def start_site(app: web.Application) -> tuple:
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+# ==================== MAIN ====================
+
+async def main(args):
+    words = load_words(os.path.join(ROOT, "banned_words.txt"))
+    if args.file:
+        updates = load_updates(args.file)
+    else:
+        updates = generate_raid(args.generate, args.users, args.rate, args.hit_rate, words, args.seed)
+        if args.save_generated:
+            with open(args.save_generated, "w", encoding="utf-8") as f:
+                for update in updates:
+                    f.write(json.dumps(update, ensure_ascii=False) + "\n")
+            print(f"[✓] Апдейты сохранены в {args.save_generated}")
+    if not updates:
+        print("[!] Нет апдейтов для проигрывания")
+        return 1
+
+    recorder = Recorder()
+    api_runner, api_url = await start_site(fake_bot_api(recorder, args.api_latency_ms / 1000))
+    backend_runner, backend_url = await start_site(
+        stub_backend(recorder, words, args.backend_latency_ms / 1000)
+    )
+
+    # config.py читает окружение при импорте — задаём до импорта бота
+    os.environ["API_URL"] = backend_url
+    os.environ["BOT_TOKEN"] = BOT_TOKEN
+    os.environ.setdefault("TARGET_CHAT_ID", "0")
+    import bot
+    import metrics
+    from filters import ban_checker
+    from telegram import Update
+    from telegram.ext import ApplicationBuilder, TypeHandler
+
+    application = (
+        ApplicationBuilder()
+        .token(BOT_TOKEN)
+        .base_url(f"{api_url}/bot")
+        .concurrent_updates(args.concurrent_updates)
+        .build()
+    )
+    bot.register_handlers(application)
+
+    finished = asyncio.Event()
+    processed = 0
+
+    async def on_processed(update: Update, context):
+        nonlocal processed
+        message = update.effective_message
+        if message is not None:
+            recorder.done(message.chat_id, message.message_id)
+        processed += 1
+        if processed == len(updates):
+            finished.set()
+
+    # Группа после всех хендлеров бота: апдейт обработан целиком
+    application.add_handler(TypeHandler(Update, on_processed), group=1000)
+
+    await ban_checker.reload_all()
+    await application.initialize()
+    await application.start()
+
+    offsets = replay_offsets(updates)
+    speedup = args.speedup
+    started = time.perf_counter()
+    for raw, offset in zip(updates, offsets):
+        if speedup:
+            delay = started + offset / speedup - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        data = {key: value for key, value in raw.items() if key != "replay_offset"}
+        update = Update.de_json(data, application.bot)
+        message = update.effective_message
+        if message is not None and message.from_user is not None:
+            recorder.feed(message.chat_id, message.message_id, message.from_user.id)
+        await application.update_queue.put(update)
+    fed_in = time.perf_counter() - started
+
+    try:
+        await asyncio.wait_for(finished.wait(), timeout=args.timeout)
+    except asyncio.TimeoutError:
+        print(f"[!] Обработано {processed} из {len(updates)} за {args.timeout} с")
+    elapsed = time.perf_counter() - started
+
+    await application.stop()
+    await application.shutdown()
+    await ban_checker.close()
+    await api_runner.cleanup()
+    await backend_runner.cleanup()
+
+    print(f"Апдейтов: {len(updates)}, обработано: {processed}")
+    print(f"Подача: {fed_in:.2f} с, всего: {elapsed:.2f} с, {processed / elapsed:,.0f} апдейтов/с")
+    for name, values in (
+        ("до deleteMessage", recorder.delete_latency),
+        ("до запроса бана", recorder.ban_latency),
+        ("до конца обработки", recorder.done_latency),
+    ):
+        values.sort()
+        print(
+            f"{name:<20} n={len(values):<6} p50 {percentile(values, 0.5) * 1000:8.2f} мс  "
+            f"p99 {percentile(values, 0.99) * 1000:8.2f} мс  max {(values[-1] if values else 0) * 1000:8.2f} мс"
+        )
+    print("Вызовы Bot API: " + ", ".join(f"{m}×{c}" for m, c in sorted(recorder.api_calls.items())))
+    print()
+    print(metrics.summary())
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "updates": len(updates),
+                "processed": processed,
+                "elapsed": elapsed,
+                "updates_per_sec": processed / elapsed,
+                "delete_ms": {q: percentile(recorder.delete_latency, q) * 1000 for q in (0.5, 0.99)},
+                "ban_ms": {q: percentile(recorder.ban_latency, q) * 1000 for q in (0.5, 0.99)},
+                "done_ms": {q: percentile(recorder.done_latency, q) * 1000 for q in (0.5, 0.99)},
+                "api_calls": recorder.api_calls,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"[✓] Результаты сохранены в {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Проигрывание Telegram-апдейтов через бота")
+    parser.add_argument("file", nargs="?", help="JSONL с апдейтами (без него — сгенерированный рейд)")
+    parser.add_argument("--speedup", type=float, default=1.0, help="ускорение; 0 — подавать без пауз")
+    parser.add_argument("--generate", type=int, default=1000, help="сообщений в рейде")
+    parser.add_argument("--users", type=int, default=200, help="участников рейда")
+    parser.add_argument("--rate", type=float, default=100, help="сообщений в секунду в рейде")
+    parser.add_argument("--hit-rate", type=float, default=0.2, help="доля сообщений с банвордом")
+    parser.add_argument("--save-generated", help="сохранить сгенерированный рейд в JSONL")
+    parser.add_argument("--api-latency-ms", type=float, default=0, help="задержка фейкового Bot API")
+    parser.add_argument("--backend-latency-ms", type=float, default=0, help="задержка заглушки бэкенда")
+    parser.add_argument("--concurrent-updates", type=int, default=1,
+                        help="параллельная обработка апдейтов (1 — как в боте по умолчанию)")
+    parser.add_argument("--timeout", type=float, default=300, help="сколько ждать обработки после подачи")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="сохранить результаты в JSON")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -12,6 +12,7 @@ SQWOZ Banword Bot - Телеграм бот с системой банвордо
 """
 
 import os
+import io
 import asyncio
 import random
 import aiohttp
@@ -33,9 +34,13 @@ from config import (
     ADMIN_PASSWORD,
     WEBAPP_URL,
     ADMIN_IDS,
-    BASE_BUYOUT_PRICE
+    BASE_BUYOUT_PRICE,
+    METRICS_PORT,
+    METRICS_HOST
 )
 from filters import ban_checker
+from profiler import profiler, ProfilerBusy
+import metrics
 
 
 # ID конфы для уведомлений (можно настроить через /setchat)
@@ -104,6 +109,8 @@ def register_handlers(application):
     application.add_handler(CommandHandler("weeklyword", cmd_weeklyword))
     application.add_handler(CommandHandler("startlottery", cmd_startlottery))
     application.add_handler(CommandHandler("filllottery", cmd_filllottery))
+    application.add_handler(CommandHandler("metrics", cmd_metrics))
+    application.add_handler(CommandHandler("cpuprofile", cmd_cpuprofile))
     
     # Callback кнопки
     application.add_handler(CallbackQueryHandler(handle_callback))
@@ -136,7 +143,7 @@ async def api_request(method: str, endpoint: str, json_data: dict = None, admin:
         headers["X-Admin-Password"] = ADMIN_PASSWORD
     
     try:
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[metrics.api_trace]) as session:
             url = f"{API_URL}{endpoint}"
             async with session.request(method, url, json=json_data, headers=headers) as resp:
                 if resp.status == 200:
@@ -170,11 +177,6 @@ async def buyout_ban(telegram_id: int):
     return await api_request("POST", f"/players/{telegram_id}/ban/buyout")
 
 
-async def get_random_lottery_word():
-    """Получить случайное слово из пула лотереи"""
-    return await api_request("GET", "/admin/lottery-words/random", admin=True)
-
-
 # ==================== NOTIFICATIONS ====================
 
 async def notify_chat_ban(context: ContextTypes.DEFAULT_TYPE, chat_id: int, user, word: str, reason: str, duration_hours: int, buyout_price: int):
@@ -248,34 +250,23 @@ async def job_weekly_lottery(context: ContextTypes.DEFAULT_TYPE):
     """Еженедельная лотерея - выбор нового слова недели"""
     print("[JOB] Запуск еженедельной лотереи...")
     
-    # Получаем случайное слово из базы данных
-    word_data = await get_random_lottery_word()
-    if not word_data or not word_data.get("word"):
-        print("[JOB] Ошибка: пул слов лотереи пуст!")
+    # Бэкенд сам выбирает слово из пула и меняет слово недели одной транзакцией
+    result = await api_request("POST", "/admin/banwords/weekly/lottery", admin=True)
+    if not result:
+        print("[JOB] Ошибка: пул слов лотереи пуст или бэкенд недоступен!")
         return
     
-    new_word = word_data["word"]
-    week_number = datetime.now().isocalendar()[1]
+    new_word = result["word"]
+    week_number = result.get("week_number") or datetime.now().isocalendar()[1]
     
-    # Сохраняем в API
-    result = await api_request(
-        "POST", 
-        "/admin/banwords/weekly",
-        {"word": new_word, "expires_at": (datetime.utcnow() + timedelta(days=7)).isoformat()},
-        admin=True
-    )
+    print(f"[JOB] Новое слово недели: {new_word}")
     
-    if result:
-        print(f"[JOB] Новое слово недели: {new_word}")
-        
-        # Обновляем локальный кэш
-        await ban_checker.load_weekly_words()
-        
-        # Уведомляем чаты
-        if TARGET_CHAT_ID:
-            await notify_weekly_word(context, TARGET_CHAT_ID, new_word, week_number)
-    else:
-        print("[JOB] Ошибка создания слова недели")
+    # Обновляем локальный кэш
+    await ban_checker.load_weekly_words()
+    
+    # Уведомляем чаты
+    if TARGET_CHAT_ID:
+        await notify_weekly_word(context, TARGET_CHAT_ID, new_word, week_number)
 
 
 async def job_check_expired_bans(context: ContextTypes.DEFAULT_TYPE):
@@ -286,6 +277,20 @@ async def job_check_expired_bans(context: ContextTypes.DEFAULT_TYPE):
         print(f"[JOB] Автоматически разбанено: {result['unbanned']} игроков")
 
 
+async def job_reconcile_counters(context: ContextTypes.DEFAULT_TYPE):
+    """Сверка счётчиков статистики с таблицами"""
+    result = await api_request("POST", "/admin/counters/reconcile", admin=True)
+    if result and result.get("drift"):
+        print(f"[JOB] Исправлен дрейф счётчиков: {result['drift']}")
+
+
+async def job_archive_game_sessions(context: ContextTypes.DEFAULT_TYPE):
+    """Удаление старых игровых сессий (итоги по дням остаются в БД)"""
+    result = await api_request("POST", "/admin/game-sessions/archive", admin=True)
+    if result and result.get("deleted"):
+        print(f"[JOB] Удалено старых игровых сессий: {result['deleted']}")
+
+
 # ==================== КОМАНДЫ ====================
 
 async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -494,6 +499,55 @@ async def cmd_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
+async def cmd_metrics(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Команда /metrics - метрики бота"""
+    user = update.effective_user
+    
+    if user.id not in ADMIN_IDS:
+        await update.message.reply_text("❌ Только для админов.")
+        return
+    
+    await update.message.reply_text(f"📈 Метрики бота\n\n{metrics.summary()}")
+
+
+async def cmd_cpuprofile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Команда /cpuprofile [секунды] - CPU-профиль бота"""
+    user = update.effective_user
+    
+    if user.id not in ADMIN_IDS:
+        await update.message.reply_text("❌ Только для админов.")
+        return
+    
+    try:
+        seconds = min(max(float(context.args[0]), 1), 120) if context.args else 10
+    except ValueError:
+        await update.message.reply_text("Использование: /cpuprofile [секунды, до 120]")
+        return
+    
+    if profiler.running:
+        await update.message.reply_text("⏳ Профилирование уже идёт.")
+        return
+    
+    await update.message.reply_text(f"⏱ Профилирую {seconds:g} с...")
+    # В фоне: пока хендлер ждёт, остальные апдейты не обрабатывались бы
+    context.application.create_task(_send_cpuprofile(update, seconds))
+
+
+async def _send_cpuprofile(update: Update, seconds: float):
+    try:
+        profile = await profiler.profile(seconds)
+    except ProfilerBusy:
+        await update.message.reply_text("⏳ Профилирование уже идёт.")
+        return
+    
+    top = "\n".join(f"{share:.0%} {frame}" for frame, share in profile.top(5))
+    await update.message.reply_document(
+        document=io.BytesIO(profile.folded().encode()),
+        filename=f"bot-{datetime.now():%Y%m%d-%H%M%S}.folded",
+        caption=f"🔥 {profile.samples} сэмплов за {profile.duration:.1f} с (flamegraph.pl / speedscope.app)\n\n{top}"[:1024]
+    )
+
+
 async def cmd_ban(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Команда /ban - забанить пользователя"""
     user = update.effective_user
@@ -651,12 +705,16 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await ban_checker.load_personal_words(user.id)
     
     # Проверяем текст
-    found, word, reason = ban_checker.check_text(text, user.id)
+    metrics.messages_scanned.inc()
+    with metrics.check_text_seconds.time():
+        found, word, reason = ban_checker.check_text(text, user.id)
     
     if found:
+        metrics.banword_matches.inc(category=reason)
         try:
             # Удаляем сообщение
-            await update.message.delete()
+            with metrics.message_delete_seconds.time():
+                await update.message.delete()
             print(f"[x] Сообщение от {user.id} удалено (слово: {word}, причина: {reason})")
             
             # Применяем бан
@@ -820,13 +878,37 @@ async def on_startup(app):
         name="check_expired_bans"
     )
     
+    # Сверка счётчиков статистики - раз в час
+    job_queue.run_repeating(
+        job_reconcile_counters,
+        interval=3600,
+        first=300,
+        name="reconcile_counters"
+    )
+    
+    # Удаление старых игровых сессий - раз в сутки ночью
+    job_queue.run_daily(
+        job_archive_game_sessions,
+        time=datetime.strptime("04:00", "%H:%M").time(),
+        name="archive_game_sessions"
+    )
+    
     print("[✓] Scheduled jobs настроены!")
+    
+    metrics.register_gauges(app, ban_checker)
+    if METRICS_PORT:
+        app.bot_data["metrics_runner"] = await metrics.start_metrics_server(METRICS_PORT, METRICS_HOST)
+        print(f"[✓] Метрики на {METRICS_HOST}:{METRICS_PORT}/metrics")
+    
     print("[✓] Бот готов к работе!")
 
 
 async def on_shutdown(app):
     """Действия при остановке бота"""
     await ban_checker.close()
+    runner = app.bot_data.get("metrics_runner")
+    if runner:
+        await runner.cleanup()
     print("[x] Бот остановлен.")
 
 
@@ -15,6 +15,10 @@ ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "sqwoz2024")
 # WebApp URLs
 WEBAPP_URL = os.getenv("WEBAPP_URL", "https://sqwozn9k-banword-bot-lilyakaaas-projects.vercel.app")
 
+# Порт локального HTTP-сервера с метриками (0 - не поднимать)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")  # 0.0.0.0 — открыть для внешнего Prometheus
+
 # Чат для уведомлений (можно изменить через /setchat)
 TARGET_CHAT_ID = int(os.getenv("TARGET_CHAT_ID", "0"))
 
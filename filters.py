@@ -2,6 +2,7 @@
 
 import aiohttp
 from config import API_URL, ADMIN_PASSWORD
+from metrics import api_trace
 
 
 class BanWordChecker:
@@ -11,28 +12,42 @@ class BanWordChecker:
         self.global_words = []
         self.weekly_words = []
         self.personal_words = {}  # telegram_id -> list of words
+        self._etags = {}  # url -> ETag последнего полученного списка
         self._session = None
     
     async def get_session(self):
         if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession()
+            self._session = aiohttp.ClientSession(trace_configs=[api_trace])
         return self._session
     
     async def close(self):
         if self._session and not self._session.closed:
             await self._session.close()
     
+    def _admin_headers(self, url: str) -> dict:
+        """Заголовки админского запроса; If-None-Match — если список уже загружен"""
+        headers = {"X-Admin-Password": ADMIN_PASSWORD}
+        if url in self._etags:
+            headers["If-None-Match"] = self._etags[url]
+        return headers
+    
+    def _remember_etag(self, url: str, resp):
+        etag = resp.headers.get("ETag")
+        if etag:
+            self._etags[url] = etag
+    
     async def load_global_words(self):
         """Загрузить глобальные банворды с сервера"""
         try:
             session = await self.get_session()
-            async with session.get(
-                f"{API_URL}/admin/banwords",
-                headers={"X-Admin-Password": ADMIN_PASSWORD}
-            ) as resp:
+            url = f"{API_URL}/admin/banwords"
+            async with session.get(url, headers=self._admin_headers(url)) as resp:
+                if resp.status == 304:
+                    return  # Список не менялся
                 if resp.status == 200:
                     data = await resp.json()
                     self.global_words = [w["word"].lower() for w in data]
+                    self._remember_etag(url, resp)
                     print(f"[✓] Загружено {len(self.global_words)} глобальных банвордов")
         except Exception as e:
             print(f"[!] Ошибка загрузки глобальных банвордов: {e}")
@@ -41,13 +56,14 @@ class BanWordChecker:
         """Загрузить еженедельные банворды с сервера"""
         try:
             session = await self.get_session()
-            async with session.get(
-                f"{API_URL}/admin/banwords/weekly",
-                headers={"X-Admin-Password": ADMIN_PASSWORD}
-            ) as resp:
+            url = f"{API_URL}/admin/banwords/weekly"
+            async with session.get(url, headers=self._admin_headers(url)) as resp:
+                if resp.status == 304:
+                    return  # Список не менялся
                 if resp.status == 200:
                     data = await resp.json()
                     self.weekly_words = [w["word"].lower() for w in data if w.get("is_active")]
+                    self._remember_etag(url, resp)
                     print(f"[✓] Загружено {len(self.weekly_words)} еженедельных банвордов")
         except Exception as e:
             print(f"[!] Ошибка загрузки еженедельных банвордов: {e}")
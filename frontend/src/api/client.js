@@ -41,7 +41,7 @@ async function fetchAPI(endpoint, options = {}) {
 
 // Авторизация через Telegram WebApp
 export async function authTelegram(initData) {
-  const data = await fetchAPI('/auth/telegram', {
+  const data = await fetchAPI('/auth/telegram/webapp', {
     method: 'POST',
     body: JSON.stringify({ init_data: initData }),
   });
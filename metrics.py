@@ -0,0 +1,138 @@
+# metrics.py - Метрики бота (Prometheus-формат на METRICS_PORT и сводка для /metrics)
+
+import re
+import time
+from typing import Optional
+
+import aiohttp
+from aiohttp import web
+
+# Реализация метрик общая с бэкендом: backend/app/prometheus.py
+from backend.app.prometheus import Gauge, MetricsRegistry
+
+
+registry = MetricsRegistry()
+
+# Проверка текста занимает микросекунды, сетевые вызовы — десятки миллисекунд
+FAST_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+NETWORK_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+messages_scanned = registry.counter("bot_messages_scanned_total", "Проверенные сообщения")
+banword_matches = registry.counter(
+    "bot_banword_matches_total", "Найденные банворды по типу", ("category",)
+)
+check_text_seconds = registry.histogram(
+    "bot_check_text_seconds", "Время BanWordChecker.check_text", buckets=FAST_BUCKETS
+)
+message_delete_seconds = registry.histogram(
+    "bot_message_delete_seconds", "Время удаления сообщения с банвордом", buckets=NETWORK_BUCKETS
+)
+api_request_seconds = registry.histogram(
+    "bot_api_request_seconds", "Время запросов к бэкенду", ("method", "endpoint", "status"),
+    buckets=NETWORK_BUCKETS
+)
+
+_ID_SEGMENT = re.compile(r"/-?\d+(?=/|$)")
+
+
+def normalize_endpoint(path: str) -> str:
+    """/players/123/ban -> /players/{id}/ban, чтобы метки не плодились по игрокам"""
+    return _ID_SEGMENT.sub("/{id}", path)
+
+
+async def _on_request_start(session, ctx, params):
+    ctx.started_at = time.perf_counter()
+
+
+async def _on_request_end(session, ctx, params):
+    _observe_api_request(ctx, params, params.response.status)
+
+
+async def _on_request_exception(session, ctx, params):
+    _observe_api_request(ctx, params, "error")
+
+
+def _observe_api_request(ctx, params, status):
+    api_request_seconds.observe(
+        time.perf_counter() - ctx.started_at,
+        method=params.method,
+        endpoint=normalize_endpoint(params.url.path),
+        status=status
+    )
+
+
+def api_trace_config() -> aiohttp.TraceConfig:
+    """TraceConfig для ClientSession: время каждого запроса к бэкенду"""
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_request_end.append(_on_request_end)
+    trace_config.on_request_exception.append(_on_request_exception)
+    return trace_config
+
+
+api_trace = api_trace_config()
+
+
+def _gauge(name: str, documentation: str, collect):
+    """Gauge без меток"""
+    registry.gauge(name, documentation, (), lambda: {(): collect()})
+
+
+def register_gauges(application, checker):
+    """Размеры очереди апдейтов и кэшей банвордов (считаются при выгрузке)"""
+    _gauge("bot_update_queue_size", "Апдейтов в очереди", lambda: application.update_queue.qsize())
+    _gauge("bot_global_words", "Глобальных банвордов", lambda: len(checker.global_words))
+    _gauge("bot_weekly_words", "Еженедельных банвордов", lambda: len(checker.weekly_words))
+    _gauge(
+        "bot_personal_words_cached_users", "Игроков в кэше личных слов",
+        lambda: len(checker.personal_words)
+    )
+    _gauge(
+        "bot_personal_words_cached", "Личных слов в кэше",
+        lambda: sum(len(words) for words in checker.personal_words.values())
+    )
+
+
+def _ms(seconds: Optional[float]) -> str:
+    return "—" if seconds is None else f"{seconds * 1000:.2f} мс"
+
+
+def summary() -> str:
+    """Короткая сводка для админской команды /metrics"""
+    lines = [
+        f"📨 Проверено сообщений: {int(messages_scanned.value())}",
+        "🎯 Совпадения: " + (
+            ", ".join(f"{key[0]}: {int(value)}" for key, value in banword_matches.items()) or "нет"
+        ),
+        f"🔍 check_text: p50 {_ms(check_text_seconds.quantile(0.5))}, "
+        f"p99 {_ms(check_text_seconds.quantile(0.99))}",
+        f"🗑 Удаление: p50 {_ms(message_delete_seconds.quantile(0.5))}, "
+        f"p99 {_ms(message_delete_seconds.quantile(0.99))}",
+    ]
+    for metric in registry.metrics():
+        if isinstance(metric, Gauge):
+            lines.append(f"📦 {metric.documentation}: {metric.collect()[()]}")
+
+    api_keys = sorted(api_request_seconds.keys(), key=lambda k: -api_request_seconds.count(k))
+    if api_keys:
+        lines.append("🌐 API:")
+    for key in api_keys[:10]:
+        method, endpoint, status = key
+        lines.append(
+            f"  {method} {endpoint} [{status}] ×{api_request_seconds.count(key)}: "
+            f"avg {_ms(api_request_seconds.mean(key))}, p99 {_ms(api_request_seconds.quantile(0.99, key))}"
+        )
+    return "\n".join(lines)
+
+
+async def start_metrics_server(port: int, host: str = "127.0.0.1") -> web.AppRunner:
+    """Поднять локальный HTTP-сервер с /metrics (наружу — только если явно задан host)"""
+    async def handle_metrics(request):
+        return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
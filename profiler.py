@@ -0,0 +1,8 @@
+# profiler.py - CPU-профайлер бота (команда /cpuprofile)
+# Реализация общая с бэкендом: backend/app/profiler.py
+
+import os
+
+from backend.app.profiler import Profile, ProfilerBusy, SamplingProfiler  # noqa: F401
+
+profiler = SamplingProfiler(os.path.dirname(os.path.abspath(__file__)))